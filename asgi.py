@@ -0,0 +1,256 @@
+"""ASGI entry point for the shop (the gateway.py options): every conversation shares one event loop.
+
+    uvicorn asgi:app --port 5000
+
+Handlers are the same functions as under Flask. Each runs on a worker thread only while it
+computes; its WhatsApp sends are collected (see post_message) and then delivered by an async
+Graph API client one after another, so an image still arrives before its buttons. Waiting on
+the API holds no thread. Messages from one customer are handled in arrival order, different
+customers concurrently.
+
+POST /webhook is handled here; every other route (GET /webhook, /payment/webhook, /, /orders,
+...) is the Flask view, called through a small WSGI bridge on a worker thread, with its sends
+delivered the same way.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+
+from udyamsakhi import config, create_app, services, start_worker
+from webhook_batch import process_batch
+from whatsapp_client import AsyncWhatsAppClient, deferred_sends, response_json
+
+# Threads only cover handler compute (and the Razorpay SDK, which is blocking)
+ASGI_HANDLER_THREADS = int(os.getenv("ASGI_HANDLER_THREADS", "16"))
+# Concurrent connections to the Graph API from the event loop
+ASGI_POOL_SIZE = int(os.getenv("ASGI_POOL_SIZE", "100"))
+
+
+class SenderQueues:
+    """Runs jobs one after another per sender and concurrently across senders"""
+
+    def __init__(self):
+        self._tails = {}  # sender -> task of the most recently submitted job
+        self.submitted = 0
+
+    def submit(self, sender, job, *args):
+        """Schedule `await job(*args)` after every earlier job of this sender; returns its task"""
+        task = asyncio.ensure_future(self._run(self._tails.get(sender), job, args))
+        self._tails[sender] = task
+        task.add_done_callback(lambda done: self._tails.get(sender) is done and self._tails.pop(sender))
+        self.submitted += 1
+        return task
+
+    @staticmethod
+    async def _run(previous, job, args):
+        if previous is not None:
+            await asyncio.wait([previous])  # its outcome is not ours to raise
+        return await job(*args)
+
+    def stats(self):
+        return {"submitted": self.submitted, "active_senders": len(self._tails)}
+
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI http scope"""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name == "content-length":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """(status, headers, body) of one WSGI request"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    chunks = wsgi_app(environ, start_response)
+    try:
+        body = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    return started["status"], started["headers"], body
+
+
+class GatewayASGI:
+    def __init__(self, flask_app, build_client, threads=ASGI_HANDLER_THREADS):
+        self.flask_app = flask_app
+        self.shop = flask_app.extensions["shop"]
+        self.build_client = build_client
+        self.senders = SenderQueues()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi-handler")
+        self._stats_lock = threading.Lock()
+        self.delivered = 0
+        self.failed = 0
+
+    @cached_property
+    def client(self):
+        """The async Graph API client, built on the event loop the first time it is needed"""
+        return self.build_client()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await read_body(receive)
+        if scope["path"] == "/webhook" and scope["method"] == "POST":
+            status, headers, body = await self._webhook(body)
+        elif scope["path"] == "/asgi/stats" and scope["method"] == "GET":
+            status, headers, body = 200, [(b"content-type", b"application/json")], json.dumps(self.stats()).encode()
+        else:
+            status, headers, body = await self._run(call_wsgi, self.flask_app, wsgi_environ(scope, body))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            event = await receive()
+            if event["type"] == "lifespan.startup":
+                loop = asyncio.get_running_loop()
+
+                async def warm_client():
+                    await self.client.warm_up()
+
+                def warm_up():
+                    # Replies go out on the async client, so that is the one to warm (not the sync one)
+                    asyncio.run_coroutine_threadsafe(warm_client(), loop).result()
+
+                # Stores, caches and background threads (outbox, exporter, catalog watcher)
+                await loop.run_in_executor(self.executor, start_worker, warm_up)
+                await send({"type": "lifespan.startup.complete"})
+            elif event["type"] == "lifespan.shutdown":
+                if "client" in self.__dict__:
+                    await self.client.aclose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _webhook(self, body):
+        text_response = [(b"content-type", b"text/html; charset=utf-8")]
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or not isinstance(data.get("entry"), list):
+            return 400, text_response, b"Invalid payload"
+
+        print(f"📩 Incoming Webhook Data: {json.dumps(data, indent=2)}")
+
+        tasks = []
+        processed, failed = process_batch(
+            data, lambda sender, message: tasks.append(self.senders.submit(sender, self._handle, sender, message))
+        )
+        services.batch_stats.record(processed + failed)  # outcomes are counted by Shop.handle_message
+        # WEBHOOK_ASYNC=1 acknowledges Meta before the replies go out, as under Flask
+        if tasks and not config.WEBHOOK_ASYNC:
+            await asyncio.wait(tasks)
+        print(f"📦 Queued {processed} message(s) from delivery" + (f", {failed} failed" if failed else ""))
+        return 200, text_response, b"OK"
+
+    async def _handle(self, sender, message):
+        try:
+            await self._run(self.shop.handle_message, sender, message)
+        except Exception as e:
+            print(f"❌ Failed to handle message {message.get('id')} from {sender}: {e}")
+
+    async def _run(self, func, *args):
+        """func(*args) on a worker thread; its WhatsApp sends go out afterwards (even if it raised)"""
+        sends = []
+
+        def call():
+            token = deferred_sends.set(sends)
+            try:
+                return func(*args)
+            finally:
+                deferred_sends.reset(token)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+        finally:
+            await self.deliver(sends)
+
+    async def deliver(self, sends):
+        """Send collected payloads in order, each after the previous one was answered"""
+        for payload, label, description, to in sends:
+            try:
+                response = await self.client.send(payload, label=label, to=to)
+            except Exception as e:  # one failed send must not drop the ones queued after it
+                print(f"❌ Failed to send {description} to {to}: {type(e).__name__} {e}")
+                response = None
+            print(f"📤 Sent {description} Response: {response_json(response)}")
+            ok = response is not None and response.status_code < 400
+            with self._stats_lock:
+                self.delivered += ok
+                self.failed += not ok
+
+    def stats(self):
+        with self._stats_lock:
+            delivered, failed = self.delivered, self.failed
+        return {
+            "senders": self.senders.stats(),
+            "delivered": delivered,
+            "failed": failed,
+            "whatsapp": self.client.stats(),
+        }
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        event = await receive()
+        if event["type"] == "http.disconnect":
+            break
+        chunks.append(event.get("body", b""))
+        if not event.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def build_client():
+    return AsyncWhatsAppClient(
+        config.WHATSAPP_ACCESS_TOKEN, config.PHONE_NUMBER_ID,
+        base_url=config.GRAPH_API_BASE, pool_size=ASGI_POOL_SIZE, timeout=config.WA_TIMEOUT,
+        # Shared with the sync client (outbox, media uploads): one set of limits per phone number
+        rate_limiter=services.rate_limiter,
+        retry_policy=services.retry_policy,
+        circuit_breaker=services.circuit_breaker,
+    )
+
+
+app = GatewayASGI(create_app(checkout="razorpay", record_bills=True, name="webhook"), build_client)
@@ -0,0 +1,280 @@
+"""Replay or synthesize Meta/Razorpay webhooks against the bot and report latency.
+
+In-process against gateway.app (point GRAPH_API_BASE / RAZORPAY_BASE_URL at stub_server.py first):
+
+    python bench_webhook.py --shoppers 200 --concurrency 32 --rate 500
+
+Against a running instance, or replaying recorded deliveries (one JSON object per line):
+
+    python bench_webhook.py --url http://127.0.0.1:5000 --replay recorded.ndjson
+
+Results can be saved with --save and compared with --baseline to catch regressions.
+"""
+import argparse
+import itertools
+import json
+import queue
+import threading
+import time
+
+# One shopper's journey through the bot, as (kind, message) steps
+SHOPPER_JOURNEY = [
+    ("text", {"type": "text", "text": {"body": "hi"}}),
+    ("button:menu_button", {"type": "interactive", "interactive": {"type": "button_reply", "button_reply": {"id": "menu_button", "title": "📜 View items"}}}),
+    ("list_reply", {"type": "interactive", "interactive": {"type": "list_reply", "list_reply": {"id": "mug_1", "title": "Handcrafted Mug - ₹250"}}}),
+    ("button:add_more", {"type": "interactive", "interactive": {"type": "button_reply", "button_reply": {"id": "add_more", "title": "➕ Add More"}}}),
+    ("list_reply", {"type": "interactive", "interactive": {"type": "list_reply", "list_reply": {"id": "scarf_1", "title": "Wool Scarf - ₹450"}}}),
+    ("button:contact_button", {"type": "interactive", "interactive": {"type": "button_reply", "button_reply": {"id": "contact_button", "title": "📞 Contact Us"}}}),
+    ("button:confirm_order", {"type": "interactive", "interactive": {"type": "button_reply", "button_reply": {"id": "confirm_order", "title": "✅ Confirm Order"}}}),
+]
+
+_message_ids = itertools.count()
+
+
+def meta_delivery(sender, message):
+    """Wrap one message in the envelope Meta posts to /webhook"""
+    message = dict(message, **{"from": sender, "id": f"wamid.bench{next(_message_ids)}", "timestamp": str(int(time.time()))})
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "bench",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "15550000000", "phone_number_id": "bench"},
+                    "contacts": [{"profile": {"name": "Bench"}, "wa_id": sender}],
+                    "messages": [message],
+                },
+            }],
+        }],
+    }
+
+
+def payment_paid_event(reference_id, amount_paise):
+    return {
+        "event": "payment_link.paid",
+        "payload": {"payment_link": {"entity": {
+            "id": f"plink_bench{next(_message_ids)}",
+            "reference_id": reference_id,
+            "amount": amount_paise,
+            "status": "paid",
+        }}},
+    }
+
+
+def classify(route, body):
+    """The bucket a request is reported under: route plus button id / message kind / event"""
+    if route != "/webhook":
+        return f"{route} {body.get('event', '?')}"
+    try:
+        message = body["entry"][0]["changes"][0]["value"]["messages"][0]
+    except (KeyError, IndexError):
+        return "/webhook other"
+    interactive = message.get("interactive", {})
+    if "button_reply" in interactive:
+        return f"/webhook button:{interactive['button_reply']['id']}"
+    if "list_reply" in interactive:
+        return "/webhook list_reply"
+    return f"/webhook {message.get('type', 'text')}"
+
+
+def synthetic_phases(shoppers, reference_lookup=None):
+    """Two phases of (route, body): every shopper's journey interleaved like concurrent customers,
+    then the Razorpay payment events (built only once the orders exist)"""
+    senders = [f"9190000{i:05d}" for i in range(shoppers)]
+
+    def journeys():
+        for _, message in SHOPPER_JOURNEY:
+            for sender in senders:
+                yield "/webhook", meta_delivery(sender, message)
+
+    def payments():
+        for sender in senders:
+            reference_id = reference_lookup(sender) if reference_lookup else None
+            yield "/payment/webhook", payment_paid_event(reference_id or f"bench-{sender}", 70000)
+
+    return [journeys, payments]
+
+
+def replay_requests(path):
+    """Yield (route, body) from an NDJSON file of raw deliveries or {"route": ..., "body": ...} records"""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "body" in record and "route" in record:
+                yield record["route"], record["body"]
+            elif "event" in record:
+                yield "/payment/webhook", record
+            else:
+                yield "/webhook", record
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(phases, post, concurrency, rate):
+    """Send every request from `concurrency` threads at up to `rate` req/s; return per-bucket latencies.
+
+    `phases` is a list of callables returning (route, body) iterables; each phase finishes before the next starts.
+    """
+    work = queue.Queue(maxsize=concurrency * 4)
+    results = {}
+    errors = {}
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            item = work.get()
+            if item is None:
+                work.task_done()
+                return
+            route, body = item
+            bucket = classify(route, body)
+            started = time.perf_counter()
+            try:
+                status = post(route, body)
+            except Exception:
+                status = 0
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                results.setdefault(bucket, []).append(elapsed)
+                if not 200 <= status < 300:
+                    errors[bucket] = errors.get(bucket, 0) + 1
+            work.task_done()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    sent = 0
+    for phase in phases:
+        for item in phase():
+            if rate:
+                delay = started + sent / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            work.put(item)
+            sent += 1
+        work.join()
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    return results, errors, time.perf_counter() - started
+
+
+def summarize(results, errors, elapsed):
+    rows = {}
+    everything = []
+    for bucket, values in results.items():
+        everything.extend(values)
+        values.sort()
+        rows[bucket] = {
+            "count": len(values),
+            "errors": errors.get(bucket, 0),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+    everything.sort()
+    return {
+        "requests": len(everything),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(everything) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(everything, 50), 2),
+        "p95_ms": round(percentile(everything, 95), 2),
+        "p99_ms": round(percentile(everything, 99), 2),
+        "buckets": rows,
+    }
+
+
+def print_report(summary):
+    print(f"\n📊 {summary['requests']} requests in {summary['elapsed_s']}s "
+          f"→ {summary['throughput_rps']} req/s "
+          f"(p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms)\n")
+    print(f"{'route / kind':<40}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for bucket, row in sorted(summary["buckets"].items()):
+        print(f"{bucket:<40}{row['count']:>8}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def compare(summary, baseline_path, tolerance):
+    """Print p95 changes against a saved run; return False if any bucket regressed beyond tolerance"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\n🔍 Compared with {baseline_path} (tolerance {tolerance:.0%})")
+    for bucket, row in sorted(summary["buckets"].items()):
+        before = baseline.get("buckets", {}).get(bucket)
+        if not before or not before["p95_ms"]:
+            continue
+        change = row["p95_ms"] / before["p95_ms"] - 1
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{'❌' if regressed else '✅'} {bucket:<40} p95 {before['p95_ms']} → {row['p95_ms']} ms ({change:+.0%})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook replay / load generator for the WhatsApp bot")
+    parser.add_argument("--url", help="base URL of a running app (default: in-process gateway.app)")
+    parser.add_argument("--replay", help="NDJSON file of recorded deliveries to replay")
+    parser.add_argument("--shoppers", type=int, default=50, help="synthetic shoppers (when not replaying)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0, help="requests per second (0 = as fast as possible)")
+    parser.add_argument("--save", help="write the summary JSON here")
+    parser.add_argument("--baseline", help="summary JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs baseline")
+    args = parser.parse_args()
+
+    reference_lookup = None
+    if args.url:
+        import requests
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+        base = args.url.rstrip("/")
+
+        def post(route, body):
+            return session.post(base + route, json=body, timeout=30).status_code
+    else:
+        import gateway
+        from udyamsakhi import services, start_worker
+        start_worker()
+        client = gateway.app.test_client()
+
+        def post(route, body):
+            return client.post(route, json=body).status_code
+
+        def reference_lookup(sender):
+            for reference_id, user_id in list(services.reference_map.items()):
+                if user_id == sender:
+                    return reference_id
+            return None
+
+    if args.replay:
+        phases = [lambda: replay_requests(args.replay)]
+    else:
+        phases = synthetic_phases(args.shoppers, reference_lookup)
+
+    results, errors, elapsed = run(phases, post, args.concurrency, args.rate)
+    summary = summarize(results, errors, elapsed)
+    print_report(summary)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Saved summary to {args.save}")
+    if args.baseline and not compare(summary, args.baseline, args.tolerance):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
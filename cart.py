@@ -0,0 +1,104 @@
+def rupees(paise):
+    """A paise amount in rupees for bills and messages: an int when whole, as prices always were"""
+    return paise // 100 if paise % 100 == 0 else paise / 100
+
+
+def format_rupees(paise):
+    """Display form of a paise amount, e.g. ₹450 or ₹249.50"""
+    return f"₹{paise // 100}" if paise % 100 == 0 else f"₹{paise / 100:.2f}"
+
+
+class Cart:
+    """A customer's cart: item id -> quantity, with the total kept up to date in paise.
+
+    Repeated taps on the same product raise its quantity instead of adding entries, so a
+    cart never holds more than one entry per product and quantities are capped. `priced_at`
+    is the (opaque) price list version the total was computed from; None if unknown.
+    """
+
+    __slots__ = ("_quantities", "_total_paise", "priced_at")
+
+    MAX_QUANTITY = 99
+
+    def __init__(self, priced_at=None):
+        self._quantities = {}
+        self._total_paise = 0
+        self.priced_at = priced_at
+
+    @property
+    def total_paise(self):
+        return self._total_paise
+
+    @property
+    def total(self):
+        """Total in rupees"""
+        return rupees(self._total_paise)
+
+    def quantity(self, item_id):
+        return self._quantities.get(item_id, 0)
+
+    def add(self, item_id, unit_price_paise, quantity=1):
+        return self.set_quantity(item_id, self.quantity(item_id) + quantity, unit_price_paise)
+
+    def remove(self, item_id, unit_price_paise, quantity=1):
+        """Take `quantity` units out (all of them with quantity=None)"""
+        current = self.quantity(item_id)
+        return self.set_quantity(item_id, 0 if quantity is None else current - quantity, unit_price_paise)
+
+    def set_quantity(self, item_id, quantity, unit_price_paise):
+        quantity = max(0, min(int(quantity), self.MAX_QUANTITY))
+        self._total_paise += (quantity - self.quantity(item_id)) * unit_price_paise
+        if quantity:
+            self._quantities[item_id] = quantity
+        else:
+            self._quantities.pop(item_id, None)
+        return self
+
+    def clear(self):
+        self._quantities.clear()
+        self._total_paise = 0
+        return self
+
+    def items(self):
+        """(item id, quantity) pairs in the order the items were first added"""
+        return self._quantities.items()
+
+    def __len__(self):
+        return len(self._quantities)
+
+    def __bool__(self):
+        return bool(self._quantities)
+
+    def __repr__(self):
+        return f"Cart({self._quantities!r}, total_paise={self._total_paise})"
+
+    def to_dict(self):
+        return {"quantities": dict(self._quantities), "total_paise": self._total_paise, "priced_at": self.priced_at}
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, list):
+            return cls.from_legacy(data)
+        cart = cls()
+        if not isinstance(data, dict):  # nothing a cart was ever stored as: start over
+            return cart
+        cart._quantities = dict(data.get("quantities", {}))
+        cart._total_paise = int(data.get("total_paise", 0))
+        priced_at = data.get("priced_at")
+        cart.priced_at = tuple(priced_at) if isinstance(priced_at, list) else priced_at  # JSON has no tuples
+        return cart
+
+    @classmethod
+    def from_legacy(cls, entries):
+        """A cart stored before quantities: one entry per tap, a (name, price ₹) pair or an item id.
+
+        Entries are keyed by what they hold; reprice() maps names back to catalog ids.
+        """
+        cart = cls()
+        for entry in entries:
+            key, price = entry if isinstance(entry, list) and len(entry) == 2 else (entry, 0)
+            try:
+                cart.add(str(key), round(float(price) * 100))
+            except (TypeError, ValueError):
+                continue
+        return cart
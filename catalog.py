@@ -0,0 +1,149 @@
+"""Product catalog loaded once from catalog.json (or a CSV with the same columns).
+
+Each load builds an immutable snapshot with an id index and the menu sections. Reloading
+on file change swaps the whole snapshot in one assignment, so readers never see a mix.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from cart import format_rupees, rupees
+
+FIELDS = ("id", "name", "price_paise", "section", "image", "description")
+
+
+class Product(namedtuple("Product", FIELDS)):
+    __slots__ = ()
+
+    @property
+    def price(self):
+        """Unit price in rupees (249.5 for ₹249.50)"""
+        return rupees(self.price_paise)
+
+    @property
+    def title(self):
+        """List-row title, e.g. "Wool Scarf - ₹450\""""
+        return f"{self.name} - {format_rupees(self.price_paise)}"
+
+
+class Catalog:
+    """Immutable product snapshot: products in file order, an id index and sections"""
+
+    __slots__ = ("products", "by_id", "sections", "version")
+
+    def __init__(self, products, version=None):
+        self.products = tuple(products)
+        by_id = {}
+        sections = {}
+        for product in self.products:
+            if product.id in by_id:
+                raise ValueError(f"Duplicate product id: {product.id}")
+            by_id[product.id] = product
+            sections.setdefault(product.section, []).append(product)
+        self.by_id = MappingProxyType(by_id)
+        self.sections = tuple((title, tuple(products)) for title, products in sections.items())
+        self.version = version
+
+    def get(self, item_id):
+        return self.by_id.get(item_id)
+
+    def page_count(self, page_size):
+        return max(1, -(-len(self.products) // page_size))
+
+    def page(self, number, page_size):
+        """Products `page_size` at a time in file order, grouped as (section title, products)"""
+        sections = []
+        for product in self.products[number * page_size:(number + 1) * page_size]:
+            if sections and sections[-1][0] == product.section:
+                sections[-1][1].append(product)
+            else:
+                sections.append((product.section, [product]))
+        return tuple((title, tuple(products)) for title, products in sections)
+
+    def __len__(self):
+        return len(self.products)
+
+    def __iter__(self):
+        return iter(self.products)
+
+
+def _product(record):
+    # A price of 0 is a free product, not a missing one
+    missing = [field for field in ("id", "name", "price") if record.get(field) is None or str(record[field]).strip() == ""]
+    if missing:
+        raise ValueError(f"Product {record!r} is missing {', '.join(missing)}")
+    price_paise = round(float(record["price"]) * 100)  # 249.50 stays ₹249.50
+    if price_paise < 0:
+        raise ValueError(f"Product {record!r} has a negative price")
+    return Product(
+        id=str(record["id"]).strip(),
+        name=str(record["name"]).strip(),
+        price_paise=price_paise,
+        section=(record.get("section") or "Products").strip(),
+        image=(record.get("image") or "").strip() or None,
+        description=(record.get("description") or "").strip(),
+    )
+
+
+def load_catalog(path):
+    """Read a catalog file (.json: a list of products or {"products": [...]}; .csv: one row per product)"""
+    stat = os.stat(path)
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        if isinstance(records, dict):
+            records = records["products"]
+    return Catalog((_product(record) for record in records), version=(stat.st_mtime_ns, stat.st_size))
+
+
+class CatalogSource:
+    """The current catalog, reloaded when its file changes; on_change(catalog) runs after each swap"""
+
+    def __init__(self, path="catalog.json", on_change=None):
+        self.path = path
+        self.on_change = on_change
+        self.current = load_catalog(path)
+        self.reloads = 0
+        self._lock = threading.Lock()
+
+    def get(self, item_id):
+        """O(1) product lookup by id; None if the product is not (or no longer) sold"""
+        return self.current.by_id.get(item_id)
+
+    def reload(self, force=False):
+        """Load the file again if it changed; a broken file keeps the previous catalog. True if swapped"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                if not force and (stat.st_mtime_ns, stat.st_size) == self.current.version:
+                    return False
+                catalog = load_catalog(self.path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Catalog reload failed, keeping the previous one: {e}")
+                return False
+            self.current = catalog
+            self.reloads += 1
+        print(f"🔄 Catalog reloaded: {len(catalog)} product(s)")
+        if self.on_change:
+            self.on_change(catalog)
+        return True
+
+    def start_watcher(self, interval=5):
+        """Poll the file for changes from a background thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload()
+
+        threading.Thread(target=run, name="catalog-watcher", daemon=True).start()
+
+    def stats(self):
+        catalog = self.current
+        return {"products": len(catalog), "sections": len(catalog.sections), "reloads": self.reloads}
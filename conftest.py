@@ -0,0 +1 @@
+"""pytest puts this directory on sys.path, so tests/ imports the top-level modules directly"""
@@ -0,0 +1,47 @@
+"""Production server for any of the apps:
+
+    gunicorn -c gunicorn.conf.py gateway:app
+
+The app is imported once in the master (preload_app) and udyamsakhi.prepare() builds the
+catalog, search index, pre-serialized payloads and media ids there, shared copy-on-write by
+the forked workers. Each worker then starts its own background threads and warms its own
+Graph API connections (udyamsakhi.start_worker); GET /ready answers 503 until that is done.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+# Handlers mostly wait on the Graph API and Razorpay, so each worker also runs a few threads
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then (staggered) to cap any slow growth in memory
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+# Taps from one customer land on any worker, so carts and payment references must live in a
+# store every worker sees (udyamsakhi.config reads it when the app is preloaded)
+os.environ.setdefault("SESSION_BACKEND", "sqlite")
+if workers > 1 and os.environ["SESSION_BACKEND"] == "memory":
+    raise SystemExit("SESSION_BACKEND=memory keeps a separate cart per worker; use sqlite or WEB_CONCURRENCY=1")
+
+
+def pre_fork(server, worker):
+    from udyamsakhi import prepare
+    prepare()  # once, before the first worker is forked
+
+    # Everything allocated so far is moved out of the collector's reach, so collections in the
+    # workers do not write to (and thereby copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from udyamsakhi import start_worker
+    start_worker()
+    server.log.info("Worker %s started its background threads", worker.pid)
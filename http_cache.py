@@ -0,0 +1,54 @@
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+# Small bodies are not worth the gzip header and CPU
+GZIP_MIN_BYTES = 1024
+
+
+def query_etag(version):
+    """Validator for a response that depends only on `version` (e.g. the newest order id) and the
+    query string, so it can be checked before any of the work that builds the body"""
+    args = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    return hashlib.sha1(f"{request.path}?{args}|{version}".encode("utf-8")).hexdigest()
+
+
+def not_modified(etag):
+    """A 304 if the client already holds the response for `etag` (either encoding), else None"""
+    for candidate in (etag, etag + "-gzip"):
+        if request.if_none_match.contains(candidate):
+            return _cache_headers(Response(status=304), candidate, 0)
+    return None
+
+
+def cached_json(payload, max_age=0, etag=None):
+    """JSON response with a strong ETag (304 on a matching If-None-Match) and gzip when accepted.
+
+    Without `etag` the validator is a hash of the body, which saves bandwidth but not the work
+    of building it; pass query_etag(...) and check not_modified() first to save both.
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if etag is None:
+        etag = hashlib.sha1(body).hexdigest()
+    compress = len(body) >= GZIP_MIN_BYTES and "gzip" in request.accept_encodings
+    if compress:
+        etag += "-gzip"  # each representation gets its own validator
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+        response = Response(body, mimetype="application/json")
+        if compress:
+            response.headers["Content-Encoding"] = "gzip"
+    return _cache_headers(response, etag, max_age)
+
+
+def _cache_headers(response, etag, max_age):
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = f"private, max-age={max_age}, must-revalidate"
+    return response
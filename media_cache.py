@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process refreshes its own images
+    fcntl = None
+
+# Uploaded WhatsApp media ids stay valid for 30 days
+MEDIA_TTL = 30 * 24 * 3600
+
+
+class MediaCache:
+    """Uploads each image once to WhatsApp and reuses the media id instead of a link.
+
+    image() never blocks on an upload: an unknown or nearly expired image is uploaded in the
+    background and the link is used until the id is ready. The url -> id index is kept on disk.
+    """
+
+    def __init__(self, client, index_path="media_index.json", ttl=MEDIA_TTL,
+                 refresh_margin=2 * 24 * 3600, on_change=None, enabled=True, retry_after=300):
+        self.client = client
+        self.enabled = enabled
+        self.retry_after = retry_after
+        self.index_path = index_path
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.on_change = on_change
+        self._downloads = requests.Session()  # no WhatsApp token on requests to image hosts
+        self._lock = threading.Lock()
+        self._uploading = set()
+        self._failed_at = {}
+        self._refreshing = False
+        self._index = self._load()
+        self.uploads = 0
+        self.failures = 0
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        # Another process may have saved since this one loaded: keep the later expiry of each entry
+        for url, entry in self._load().items():
+            if entry["expires_at"] > self._index.get(url, {}).get("expires_at", 0):
+                self._index[url] = entry
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"  # every worker process may save
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def image(self, url):
+        """The "image" object for a message: {"id": ...} when cached, else {"link": url}"""
+        if not self.enabled:
+            return {"link": url}
+        entry = self._index.get(url)
+        now = time.time()
+        # Renewing ids ahead of expiry is the refresher's job when one runs (in one process only)
+        if entry is None or entry["expires_at"] - now < (0 if self._refreshing else self.refresh_margin):
+            self._upload_in_background(url)
+        if entry is not None and entry["expires_at"] > now:
+            return {"id": entry["id"]}
+        return {"link": url}
+
+    def _upload_in_background(self, url):
+        """Start uploading `url` unless it is already in flight or failed recently; returns the thread"""
+        with self._lock:
+            if url in self._uploading or time.time() - self._failed_at.get(url, 0) < self.retry_after:
+                return None
+            self._uploading.add(url)
+        thread = threading.Thread(target=self._upload, args=(url,), name="media-upload", daemon=True)
+        thread.start()
+        return thread
+
+    def _upload(self, url):
+        try:
+            response = self._downloads.get(url, timeout=30)
+            response.raise_for_status()
+            mime_type = response.headers.get("Content-Type", "image/jpeg").split(";")[0]
+            filename = os.path.basename(urlparse(url).path) or "image"
+            media_id = self.client.upload_media(response.content, mime_type, filename)
+            with self._lock:
+                self._index[url] = {"id": media_id, "expires_at": time.time() + self.ttl}
+                self._failed_at.pop(url, None)
+                self._save()
+                self.uploads += 1
+            print(f"🖼️ Uploaded {filename} as media {media_id}")
+            if self.on_change:
+                self.on_change(url)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self._failed_at[url] = time.time()
+            print(f"⚠️ Media upload failed for {url}: {e}")
+        finally:
+            with self._lock:
+                self._uploading.discard(url)
+
+    def refresh(self, urls=None, wait=False):
+        """Upload every given or indexed image that is missing or close to expiry.
+
+        Uploads run in the background; wait=True blocks until they have finished.
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        threads = []
+        for url in list(urls if urls is not None else self._index):
+            entry = self._index.get(url)
+            if entry is None or entry["expires_at"] - now < self.refresh_margin:
+                threads.append(self._upload_in_background(url))
+        if wait:
+            for thread in threads:
+                if thread is not None:
+                    thread.join()
+
+    def _merge_from_disk(self):
+        """Adopt the ids other processes uploaded (the later expiry of each entry wins)"""
+        on_disk = self._load()
+        with self._lock:
+            changed = [url for url, entry in on_disk.items()
+                       if entry["expires_at"] > self._index.get(url, {}).get("expires_at", 0)]
+            for url in changed:
+                self._index[url] = on_disk[url]
+        if self.on_change:
+            for url in changed:
+                self.on_change(url)
+        return changed
+
+    def start_refresher(self, interval=3600):
+        """Re-upload indexed images ahead of expiry from a background thread.
+
+        Every worker process starts one, but only the holder of the index lock file uploads;
+        the others pick up its ids from the index file, and one takes over when it exits.
+        """
+        if not self.enabled:
+            return
+        self._refreshing = True
+
+        def run():
+            lock_fd = None
+            while True:
+                time.sleep(interval)
+                try:
+                    self._merge_from_disk()
+                    if fcntl is not None and lock_fd is None:
+                        fd = os.open(f"{self.index_path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                        try:
+                            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            os.close(fd)
+                            continue  # another process refreshes
+                        lock_fd = fd  # held for the life of this process
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠️ Media refresh failed: {e}")
+
+        threading.Thread(target=run, name="media-refresher", daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._index),
+                "uploading": len(self._uploading),
+                "uploads": self.uploads,
+                "failures": self.failures,
+            }
@@ -0,0 +1,302 @@
+"""Append-only order log: one JSON record per line, with a side index of record offsets.
+
+Appending a confirmed order is a single write at the end of the file, however many orders
+came before it. bills.json is no longer written directly; it is exported from the log.
+
+    python order_log.py export order_log.ndjson bills.json
+    python order_log.py import bills.json order_log.ndjson
+"""
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still serialized within one process
+    fcntl = None
+
+# Side index: one little-endian uint64 per record, the byte offset where it starts in the log
+OFFSET = struct.Struct("<Q")
+
+
+class OrderLog:
+    """Newline-framed JSON order log with O(1) appends and an offset index for random reads.
+
+    fsync: "none" leaves flushing to the OS, "always" fsyncs every append, and "group"
+    (group commit) lets concurrent appenders share one fsync, waiting up to group_window
+    seconds for company.
+    """
+
+    def __init__(self, path="order_log.ndjson", index_path=None, fsync="group", group_window=0.005):
+        if fsync not in ("none", "always", "group"):
+            raise ValueError(f"Unknown fsync mode: {fsync}")
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+        self.fsync = fsync
+        self.group_window = group_window
+        self._open()
+        self._lock = threading.Lock()
+        self._sync_cond = threading.Condition()
+        self._written = 0  # appends made by this process
+        self._synced = 0  # appends known to be on disk
+        self._syncing = False
+        self._offsets = []
+        self._end = 0
+        self.appends = 0
+        self.fsyncs = 0
+        with self._file_lock():
+            self._recover()
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize with other processes appending to the same log"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: flock belongs to the open file, which the child shares with its parent.
+                # The inherited descriptors stay open for readers that may still hold them
+                self._open()
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _recover(self):
+        """Drop a torn last record and bring the side index in line with the log"""
+        size = os.fstat(self._fd).st_size
+        if size and os.pread(self._fd, 1, size - 1) != b"\n":
+            tail_start = max(0, size - 65536)
+            while True:
+                chunk = os.pread(self._fd, size - tail_start, tail_start)
+                newline = chunk.rfind(b"\n")
+                if newline >= 0 or tail_start == 0:
+                    break
+                tail_start = max(0, tail_start - 65536)
+            good = tail_start + newline + 1 if newline >= 0 else 0
+            print(f"⚠️ Order log {self.path}: dropping {size - good} byte(s) of a torn record")
+            os.ftruncate(self._fd, good)
+            size = good
+
+        index_size = os.fstat(self._index_fd).st_size
+        raw = os.pread(self._index_fd, index_size - index_size % OFFSET.size, 0)
+        offsets = [offset for (offset,) in OFFSET.iter_unpack(raw)]
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+        if len(offsets) * OFFSET.size != index_size:
+            os.ftruncate(self._index_fd, len(offsets) * OFFSET.size)
+
+        # Records written after the last index entry (crash between the two writes)
+        position = offsets[-1] if offsets else 0
+        if offsets:
+            position += len(self._read_line(position))
+        missing = []
+        with open(self.path, "rb") as f:
+            f.seek(position)
+            for line in f:
+                missing.append(position)
+                position += len(line)
+        if missing:
+            os.write(self._index_fd, b"".join(OFFSET.pack(offset) for offset in missing))
+            offsets.extend(missing)
+        self._offsets = offsets
+        self._end = size
+
+    def _catch_up(self):
+        """Pick up index entries appended by other processes since we last looked"""
+        index_size = os.fstat(self._index_fd).st_size
+        known = len(self._offsets) * OFFSET.size
+        if index_size > known:
+            raw = os.pread(self._index_fd, index_size - known - (index_size - known) % OFFSET.size, known)
+            self._offsets.extend(offset for (offset,) in OFFSET.iter_unpack(raw))
+        self._end = os.fstat(self._fd).st_size
+
+    def append(self, record):
+        """Write one record at the end of the log and return its sequence number"""
+        return self.append_many([record])[0]
+
+    def append_many(self, records):
+        """Write several records with one write() (and at most one fsync); return their sequence numbers"""
+        lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records]
+        with self._file_lock():
+            self._catch_up()
+            start = self._end
+            offsets = []
+            for line in lines:
+                offsets.append(start)
+                start += len(line)
+            os.write(self._fd, b"".join(lines))
+            os.write(self._index_fd, b"".join(OFFSET.pack(offset) for offset in offsets))
+            first = len(self._offsets)
+            self._offsets.extend(offsets)
+            self._end = start
+            self.appends += len(lines)
+            with self._sync_cond:
+                self._written += 1
+                ticket = self._written
+        if self.fsync == "always":
+            self._fsync()
+        elif self.fsync == "group":
+            self._group_commit(ticket)
+        return list(range(first, first + len(lines)))
+
+    def _fsync(self):
+        os.fsync(self._fd)
+        os.fsync(self._index_fd)
+        self.fsyncs += 1
+
+    def _group_commit(self, ticket):
+        """Return once append `ticket` is durable; one caller fsyncs for everyone waiting"""
+        with self._sync_cond:
+            while self._synced < ticket:
+                if not self._syncing:
+                    self._syncing = True
+                    break
+                self._sync_cond.wait()
+            else:
+                return
+        covered = 0
+        try:
+            if self.group_window:
+                time.sleep(self.group_window)
+            with self._sync_cond:
+                pending = self._written
+            self._fsync()
+            covered = pending
+        finally:
+            with self._sync_cond:
+                self._syncing = False
+                self._synced = max(self._synced, covered)
+                self._sync_cond.notify_all()
+
+    def _read_line(self, offset):
+        chunk = b""
+        while True:
+            part = os.pread(self._fd, 4096, offset + len(chunk))
+            newline = part.find(b"\n")
+            if newline >= 0:
+                return chunk + part[:newline + 1]
+            if not part:
+                return chunk
+            chunk += part
+
+    def get(self, seq):
+        """The record with sequence number `seq`, read straight from its indexed offset"""
+        with self._lock:
+            if seq >= len(self._offsets):
+                self._catch_up()
+            offset = self._offsets[seq]
+        return json.loads(self._read_line(offset))
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return len(self._offsets)
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start=0):
+        """Stream records from sequence number `start` onwards without loading the whole log"""
+        with self._lock:
+            self._catch_up()
+            if start >= len(self._offsets):
+                return
+            offset, end = self._offsets[start], self._end
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while offset < end:
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                yield json.loads(line)
+
+    def export_json(self, path="bills.json"):
+        """Write the log out as a JSON array (the old bills.json format), replacing the file atomically"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"  # the CLI may export while a server does
+        count = 0
+        with open(tmp_path, "w") as f:
+            f.write("[")
+            for record in self.records():
+                f.write(",\n  " if count else "\n  ")
+                f.write(json.dumps(record, ensure_ascii=False))
+                count += 1
+            f.write("\n]\n" if count else "]\n")
+        os.replace(tmp_path, path)
+        return count
+
+    def import_json(self, path="bills.json", batch_size=500):
+        """Append every order from a bills.json-style array; returns how many were imported"""
+        with open(path) as f:
+            orders = json.load(f)
+        for i in range(0, len(orders), batch_size):
+            self.append_many(orders[i:i + batch_size])
+        return len(orders)
+
+    def start_exporter(self, path="bills.json", interval=60):
+        """Refresh the bills.json export from a background thread whenever the log has grown.
+
+        Every worker process starts one, but only the holder of the exporter lock file writes;
+        the others keep trying, so one takes over when that process exits.
+        """
+        def run():
+            exported = None
+            lock_fd = None
+            while True:
+                time.sleep(interval)
+                try:
+                    if fcntl is not None and lock_fd is None:
+                        fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                        try:
+                            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            os.close(fd)
+                            continue  # another process exports
+                        lock_fd = fd  # held for the life of this process
+                    count = len(self)
+                    if count != exported:
+                        self.export_json(path)
+                        exported = count
+                except Exception as e:
+                    print(f"⚠️ Exporting {path} failed: {e}")
+
+        threading.Thread(target=run, name="order-log-exporter", daemon=True).start()
+
+    def stats(self):
+        return {
+            "records": len(self),
+            "bytes": self._end,
+            "fsync": self.fsync,
+            "appends": self.appends,
+            "fsyncs": self.fsyncs,
+        }
+
+    def close(self):
+        os.close(self._fd)
+        os.close(self._index_fd)
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] not in ("export", "import"):
+        raise SystemExit("usage: order_log.py export LOG bills.json | order_log.py import bills.json LOG")
+    if sys.argv[1] == "export":
+        log = OrderLog(sys.argv[2], fsync="none")
+        print(f"✅ Exported {log.export_json(sys.argv[3])} order(s) to {sys.argv[3]}")
+    else:
+        log = OrderLog(sys.argv[3], fsync="always")
+        print(f"✅ Imported {log.import_json(sys.argv[2])} order(s) into {sys.argv[3]}")
+
+
+if __name__ == "__main__":
+    main()
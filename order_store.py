@@ -0,0 +1,331 @@
+"""SQLite order store (WAL mode) indexed by customer, time and payment id.
+
+Import the existing files once (safe to re-run, duplicates are skipped):
+
+    python order_store.py import bills.json orders.json
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    user_id TEXT,
+    username TEXT,
+    address TEXT,
+    timestamp TEXT NOT NULL,
+    items TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    payment_id TEXT,
+    reference_id TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_user ON orders (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS orders_timestamp ON orders (timestamp);
+-- Partial indexes: payment lookups, and timestamp-ordered walks for paid / unpaid pages
+DROP INDEX IF EXISTS orders_payment;
+CREATE INDEX IF NOT EXISTS orders_payment_id ON orders (payment_id) WHERE payment_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS orders_paid ON orders (timestamp) WHERE payment_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS orders_unpaid ON orders (timestamp) WHERE payment_id IS NULL;
+-- One row per distinct item name in an order, kept in timestamp order for item-filtered pages
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id INTEGER NOT NULL,
+    name TEXT NOT NULL COLLATE NOCASE,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (order_id, name)
+);
+CREATE INDEX IF NOT EXISTS order_items_name ON order_items (name, timestamp, order_id);
+CREATE TRIGGER IF NOT EXISTS orders_index_items AFTER INSERT ON orders BEGIN
+    INSERT OR IGNORE INTO order_items (order_id, name, timestamp)
+    SELECT NEW.id, json_extract(value, '$.name'), NEW.timestamp
+    FROM json_each(NEW.items) WHERE json_extract(value, '$.name') IS NOT NULL;
+END;
+"""
+
+# Stores created before order_items existed
+BACKFILL_ITEMS_SQL = """
+INSERT OR IGNORE INTO order_items (order_id, name, timestamp)
+SELECT o.id, json_extract(j.value, '$.name'), o.timestamp
+FROM orders o, json_each(o.items) j WHERE json_extract(j.value, '$.name') IS NOT NULL
+"""
+
+COLUMNS = ("id", "source", "user_id", "username", "address", "timestamp", "items", "total", "payment_id", "reference_id")
+
+# One statement text for every insert, so sqlite3's statement cache keeps it prepared
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO orders "
+    "(dedup_key, source, user_id, username, address, timestamp, items, total, payment_id, reference_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_SQL = f"SELECT {', '.join(COLUMNS)} FROM orders"
+PAGE_COLUMNS = ", ".join(f"o.{column}" for column in COLUMNS)
+
+# Formats the bot has written timestamps in (bills.json uses isoformat())
+TIMESTAMP_FORMATS = ("%d-%m-%Y %H:%M:%S",)
+
+
+def normalize_timestamp(value):
+    """ISO 8601 text, so timestamps sort and range-compare correctly"""
+    if not value:
+        return datetime.now().isoformat()
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).isoformat()
+        except ValueError:
+            pass
+    return value
+
+
+def iter_json_records(path, chunk_size=65536):
+    """Stream the objects out of a JSON array or of newline/comma separated JSON fragments"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with open(path, encoding="utf-8") as f:
+        eof = False
+        while True:
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+                    position += 1
+                if position >= len(buffer):
+                    break
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if eof:
+                        raise
+                    break  # object continues in the next chunk
+                position = end
+                yield record
+            buffer = buffer[position:]
+            if eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+
+
+def encode_cursor(timestamp, order_id):
+    return base64.urlsafe_b64encode(f"{timestamp}|{order_id}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from an opaque page cursor; ValueError if it was tampered with"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, order_id = raw.rsplit("|", 1)
+        return timestamp, int(order_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class OrderStore:
+    """Confirmed and paid orders in SQLite; one connection per thread"""
+
+    def __init__(self, path="orders.sqlite3"):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # a connection must not be used across fork()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM order_items) AND EXISTS (SELECT 1 FROM orders)").fetchone()[0]:
+                conn.execute(BACKFILL_ITEMS_SQL)
+            # Statistics let the planner pick the partial and item indexes; gathered once, then
+            # refreshed by optimize whenever the tables have grown enough to matter
+            if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1')").fetchone()[0]:
+                conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(order, source):
+        items = order.get("items", [])
+        payment_id = order.get("payment_id")
+        if payment_id:
+            dedup_key = f"{source}:{payment_id}"  # Razorpay retries the same event
+        else:
+            dedup_key = hashlib.sha1(json.dumps(order, sort_keys=True).encode("utf-8")).hexdigest()
+        return (
+            dedup_key, source, order.get("user_id"), order.get("username"), order.get("address"),
+            normalize_timestamp(order.get("timestamp")), json.dumps(items, ensure_ascii=False),
+            round(float(order.get("total", 0)), 2), payment_id, order.get("reference_id"),
+        )
+
+    @contextmanager
+    def batch(self):
+        """Collect every add() inside the block and insert them in a single transaction"""
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+        self._local.pending = []
+        try:
+            yield
+            rows, self._local.pending = self._local.pending, None
+            self._insert(rows)
+        finally:
+            self._local.pending = None
+
+    def add(self, order, source="bill"):
+        """Record one order dict (the bill_data shape); duplicates are ignored"""
+        row = self._row(order, source)
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(row)
+        else:
+            self._insert([row])
+
+    def add_many(self, orders, source="bill"):
+        self._insert([self._row(order, source) for order in orders])
+
+    def _insert(self, rows):
+        if not rows:
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inserted = conn.executemany(INSERT_SQL, rows).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return inserted
+
+    def import_file(self, path, source, batch_size=500):
+        """Stream orders from a bills.json / orders.json style file in batches; returns rows inserted"""
+        inserted = 0
+        rows = []
+        for order in iter_json_records(path):
+            rows.append(self._row(order, source))
+            if len(rows) >= batch_size:
+                inserted += self._insert(rows)
+                rows = []
+        return inserted + self._insert(rows)
+
+    @staticmethod
+    def _order(row):
+        order = dict(row)
+        order["items"] = json.loads(order["items"])
+        return order
+
+    def for_user(self, user_id, limit=50):
+        """A customer's most recent orders"""
+        rows = self._conn().execute(
+            f"{SELECT_SQL} WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?", (user_id, limit)
+        )
+        return [self._order(row) for row in rows]
+
+    def by_payment(self, payment_id):
+        rows = self._conn().execute(f"{SELECT_SQL} WHERE payment_id = ? ORDER BY id", (payment_id,))
+        return [self._order(row) for row in rows]
+
+    def between(self, start, end, limit=1000):
+        """Orders with start <= timestamp < end (ISO strings or datetimes)"""
+        if isinstance(start, datetime):
+            start = start.isoformat()
+        if isinstance(end, datetime):
+            end = end.isoformat()
+        rows = self._conn().execute(
+            f"{SELECT_SQL} WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp LIMIT ?", (start, end, limit)
+        )
+        return [self._order(row) for row in rows]
+
+    def page(self, user_id=None, start=None, end=None, paid=None, item=None, cursor=None, limit=50):
+        """Newest-first orders matching the filters, after `cursor`; returns (orders, next_cursor).
+
+        Keyset pagination on (timestamp, id): every page is an index range scan, however deep.
+        An item filter walks the order_items index instead, which is kept in the same order;
+        with a customer too, their orders are walked and each is probed for the item, since one
+        customer has far fewer orders than a popular item.
+        """
+        where, params = [], []
+        if item and not user_id:
+            sql = f"SELECT {PAGE_COLUMNS} FROM order_items i JOIN orders o ON o.id = i.order_id"
+            timestamp, key = "i.timestamp", "i.order_id"
+            where.append("i.name = ?")
+            params.append(item)
+        else:
+            sql = f"SELECT {PAGE_COLUMNS} FROM orders o"
+            timestamp, key = "o.timestamp", "o.id"
+        if user_id:
+            where.append("o.user_id = ?")
+            params.append(user_id)
+            if item:
+                where.append("EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.id AND i.name = ?)")
+                params.append(item)
+        if start:
+            where.append(f"{timestamp} >= ?")
+            params.append(start)
+        if end:
+            where.append(f"{timestamp} < ?")
+            params.append(end)
+        if paid is not None:
+            where.append("o.payment_id IS NOT NULL" if paid else "o.payment_id IS NULL")
+        if cursor:
+            last_timestamp, last_id = decode_cursor(cursor)
+            where.append(f"({timestamp}, {key}) < (?, ?)")
+            params.extend((last_timestamp, last_id))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {timestamp} DESC, {key} DESC LIMIT ?"
+        params.append(limit + 1)
+        orders = [self._order(row) for row in self._conn().execute(sql, params)]
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor(orders[-1]["timestamp"], orders[-1]["id"])
+        return orders, next_cursor
+
+    def version(self):
+        """Newest order id: orders are only ever inserted, so it changes whenever any query result can"""
+        return self._conn().execute("SELECT coalesce(max(id), 0) FROM orders").fetchone()[0]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def stats(self):
+        rows = self._conn().execute("SELECT source, COUNT(*) FROM orders GROUP BY source").fetchall()
+        return {source: count for source, count in rows}
+
+
+# The files each source was written to before the store existed
+LEGACY_FILES = {"bills.json": "bill", "orders.json": "payment"}
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != "import":
+        raise SystemExit("usage: order_store.py import bills.json [orders.json ...] [--db orders.sqlite3]")
+    args = sys.argv[2:]
+    db_path = "orders.sqlite3"
+    if "--db" in args:
+        i = args.index("--db")
+        db_path = args[i + 1]
+        del args[i:i + 2]
+    store = OrderStore(db_path)
+    for path in args:
+        source = LEGACY_FILES.get(path.rsplit("/", 1)[-1], "bill")
+        print(f"✅ Imported {store.import_file(path, source)} new order(s) from {path}")
+    print(f"📦 {store.count()} order(s) in {db_path}")
+
+
+if __name__ == "__main__":
+    main()
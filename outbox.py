@@ -0,0 +1,271 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    recipient TEXT,
+    label TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    claimed_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_recipient ON outbox (recipient, id);
+"""
+
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO outbox (dedup_key, recipient, label, payload, next_attempt_at, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+# Oldest due message whose recipient has nothing older still in flight, so each
+# customer's messages go out in the order they were written
+CLAIM_SQL = """
+SELECT id, recipient, label, payload, attempts, created_at FROM outbox o
+WHERE status = 'pending' AND next_attempt_at <= ?
+  AND NOT EXISTS (
+      SELECT 1 FROM outbox p
+      WHERE p.recipient = o.recipient AND p.id < o.id AND p.status IN ('pending', 'sending')
+  )
+ORDER BY id LIMIT 1
+"""
+
+
+class Outbox:
+    """Durable SQLite outbox for outbound WhatsApp payloads (at-least-once delivery).
+
+    A failed message is retried with its own backoff, `base_delay` doubling up to `max_delay`,
+    for as long as it is younger than `max_age`; only a fatal (4xx) answer gives up sooner.
+    Nothing is sent, and no attempt is spent, while the client's circuit breaker is open.
+    """
+
+    def __init__(self, path, client, workers=2, max_age=86400, base_delay=30.0, max_delay=900.0,
+                 poll_interval=1.0, retention=86400, lease=300):
+        self.path = path
+        self.client = client
+        self.workers = max(1, int(workers))
+        self.max_age = max_age
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lease = lease  # a row 'sending' for longer than this was abandoned (process died mid-send)
+        self._last_purge = 0.0
+        self._local = threading.local()
+        self._claim_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # a connection must not be used across fork()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            if "claimed_at" not in {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}:
+                conn.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")  # outboxes created before leases
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def dedup_scope(self, key):
+        """Derive dedup keys from `key` (e.g. the inbound wamid) so a redelivered event enqueues nothing new"""
+        previous = getattr(self._local, "scope", None)
+        self._local.scope = [key, 0] if key else None
+        try:
+            yield
+        finally:
+            self._local.scope = previous
+
+    @contextmanager
+    def batch(self):
+        """Collect every put() inside the block and write them in a single transaction"""
+        if getattr(self._local, "pending", None) is not None:
+            yield
+            return
+        self._local.pending = []
+        try:
+            yield
+            rows, self._local.pending = self._local.pending, None
+            self._insert(rows)
+        finally:
+            self._local.pending = None
+
+    def put(self, payload, label="message", dedup_key=None, to=None):
+        """Record a payload (dict, or encoded JSON bytes plus `to`) for delivery and return its dedup key"""
+        if dedup_key is None:
+            scope = getattr(self._local, "scope", None)
+            if scope is not None:
+                scope[1] += 1
+                dedup_key = f"{scope[0]}:{scope[1]}"
+            else:
+                dedup_key = uuid.uuid4().hex
+        now = time.time()
+        if isinstance(payload, dict):
+            to = payload.get("to")
+            payload = json.dumps(payload, ensure_ascii=False)
+        elif isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+        row = (dedup_key, to, label, payload, now, now)
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending.append(row)
+        else:
+            self._insert([row])
+        return dedup_key
+
+    def _insert(self, rows):
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(INSERT_SQL, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._wakeup.set()
+
+    def recover(self):
+        """Requeue anything left in flight by a previous run (only while no process is sending)"""
+        recovered = self._conn().execute(
+            "UPDATE outbox SET status = 'pending' WHERE status = 'sending'"
+        ).rowcount
+        if recovered:
+            print(f"♻️ Outbox recovered {recovered} in-flight message(s)")
+        return recovered
+
+    def start(self, recover=True):
+        """Start the delivery workers, first requeueing in-flight messages unless recover=False
+        (several processes share the outbox: one recovery before they start, not one each)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            if recover:
+                self.recover()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _claim(self):
+        conn = self._conn()
+        with self._claim_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                # Rows whose sender died mid-send (crash, recycled worker) go back in the queue;
+                # until then they would block every later message to the same customer
+                reclaimed = conn.execute(
+                    "UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND coalesce(claimed_at, 0) < ?",
+                    (now - self.lease,),
+                ).rowcount
+                row = conn.execute(CLAIM_SQL, (now,)).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE outbox SET status = 'sending', attempts = attempts + 1, claimed_at = ? WHERE id = ?",
+                        (now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if reclaimed:
+            print(f"♻️ Outbox reclaimed {reclaimed} message(s) abandoned mid-send")
+        return row
+
+    def _run(self):
+        breaker = self.client.circuit_breaker
+        while True:
+            closed_for = breaker.retry_in()
+            if closed_for > 0:  # the API is down: leave every row where it is until a trial may go out
+                time.sleep(min(closed_for, self.poll_interval))
+                continue
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                print(f"⚠️ Outbox claim failed: {e}")
+                row = None
+            if row is None:
+                self._purge()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self._deliver(*row)
+            except Exception as e:
+                # This thread is the only sender: keep it alive and put the row back with backoff
+                print(f"⚠️ Outbox delivery of message {row[0]} failed: {type(e).__name__} {e}")
+                try:
+                    self._retry_later(row[0], row[2], row[4], row[5], f"{type(e).__name__}: {e}"[:500])
+                except sqlite3.Error as e:
+                    print(f"⚠️ Outbox could not requeue message {row[0]}, the lease will: {e}")
+
+    def _deliver(self, row_id, recipient, label, payload, attempts, created_at):
+        response = self.client.send(payload.encode("utf-8"), label=label, to=recipient)
+        conn = self._conn()
+
+        if response is None and self.client.circuit_breaker.state != "closed":
+            # Rejected (or tripped) by the breaker: not the message's fault, so the attempt is given back
+            conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = attempts - 1, next_attempt_at = ?, "
+                "last_error = 'circuit open' WHERE id = ?",
+                (time.time() + max(self.client.circuit_breaker.retry_in(), self.poll_interval), row_id),
+            )
+            return
+
+        outcome = "transient" if response is None else self.client.retry_policy.classify(response)
+        if outcome == "ok":
+            conn.execute("UPDATE outbox SET status = 'sent', sent_at = ? WHERE id = ?", (time.time(), row_id))
+            return
+
+        error = "no response" if response is None else response.text[:500]
+        self._retry_later(row_id, label, attempts, created_at, error, fatal=outcome == "fatal")
+
+    def _retry_later(self, row_id, label, attempts, created_at, error, fatal=False):
+        """Back to 'pending' after a backoff delay, or 'dead' if fatal or older than max_age"""
+        conn = self._conn()
+        now = time.time()
+        if fatal or now - created_at >= self.max_age:
+            print(f"❌ Outbox giving up on message {row_id} ({label}) after {attempts + 1} attempt(s): {error}")
+            conn.execute("UPDATE outbox SET status = 'dead', last_error = ? WHERE id = ?", (error, row_id))
+            return
+
+        # Minutes, not the client's seconds: the client already retried this send in-process
+        delay = min(self.max_delay, self.base_delay * 2 ** min(attempts, 16))
+        delay = random.uniform(delay / 2, delay)
+        conn.execute(
+            "UPDATE outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (now + delay, error, row_id),
+        )
+
+    def _purge(self):
+        """Drop delivered rows older than the retention window (at most every 10 minutes)"""
+        now = time.time()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        self._conn().execute(
+            "DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (now - self.retention,)
+        )
+
+    def stats(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return dict(rows)
@@ -0,0 +1,73 @@
+import json
+import threading
+
+# Stand-in for the recipient while the static part of a payload is serialized
+RECIPIENT_MARKER = "\u0000recipient\u0000"
+
+
+class PayloadTemplate:
+    """A message body encoded once; rendering only splices the recipient between two byte strings"""
+
+    def __init__(self, body):
+        message = {"messaging_product": "whatsapp", "to": RECIPIENT_MARKER}
+        message.update(body)
+        encoded = json.dumps(message, ensure_ascii=False).encode("utf-8")
+        marker = json.dumps(RECIPIENT_MARKER).encode("utf-8")
+        self.prefix, self.suffix = encoded.split(marker)
+
+    def render(self, to):
+        return self.prefix + json.dumps(str(to)).encode("utf-8") + self.suffix
+
+
+class TemplateCache:
+    """Named payload templates built from builder functions, rebuilt only after invalidate().
+
+    A builder may take arguments (e.g. a page number); each distinct argument tuple is
+    cached as its own template.
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def register(self, name):
+        """Decorator: register a function returning the static message body (everything but "to")"""
+        def decorator(builder):
+            self._builders[name] = builder
+            return builder
+        return decorator
+
+    def get(self, name, *args):
+        key = (name, args)
+        template = self._templates.get(key)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(key)
+                if template is None:
+                    template = PayloadTemplate(self._builders[name](*args))
+                    self._templates[key] = template
+        return template
+
+    def render(self, name, to, *args):
+        return self.get(name, *args).render(to)
+
+    def warm(self, **args):
+        """Serialize templates up front (at startup or after a catalog change).
+
+        Builders without parameters are always built; pass name=[args, ...] to warm others.
+        """
+        for name, builder in self._builders.items():
+            if name in args:
+                for arg in args[name]:
+                    self.get(name, *(arg if isinstance(arg, tuple) else (arg,)))
+            elif builder.__code__.co_argcount == len(builder.__defaults__ or ()):
+                self.get(name)
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._templates.clear()
+            else:
+                for key in [key for key in self._templates if key[0] == name]:
+                    del self._templates[key]
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, now=None):
+        """Take one token and return how many seconds until it is actually available (0 = now)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def idle(self, now):
+        """True once the bucket has refilled completely (it can be dropped and recreated)"""
+        with self._lock:
+            return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """Outbound send limits for one business phone number and for each recipient.
+
+    Sends go out immediately while both buckets have tokens; the caller only waits
+    for the exact time until the next token when a real limit has been reached.
+    """
+
+    def __init__(self, phone_rate=80, phone_burst=80, recipient_rate=1 / 6, recipient_burst=45,
+                 max_recipients=10000):
+        self.phone = TokenBucket(phone_rate, phone_burst)
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.max_recipients = max_recipients
+        self._recipients = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.waited_total = 0.0
+
+    def _bucket_for(self, recipient, now):
+        with self._lock:
+            bucket = self._recipients.get(recipient)
+            if bucket is None:
+                bucket = TokenBucket(self.recipient_rate, self.recipient_burst)
+                self._recipients[recipient] = bucket
+                # Drop the least recently used buckets once they have refilled; a full bucket
+                # is identical to a fresh one, so nothing is lost
+                while len(self._recipients) > self.max_recipients:
+                    oldest, old_bucket = next(iter(self._recipients.items()))
+                    if not old_bucket.idle(now):
+                        break
+                    del self._recipients[oldest]
+            else:
+                self._recipients.move_to_end(recipient)
+            return bucket
+
+    def reserve(self, recipient=None):
+        """Reserve a send slot and return the delay in seconds before it may go out"""
+        now = time.monotonic()
+        wait = self.phone.reserve(now)
+        if recipient is not None:
+            wait = max(wait, self._bucket_for(recipient, now).reserve(now))
+        with self._stats_lock:
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.waited_total += wait
+        return wait
+
+    def acquire(self, recipient=None):
+        """Block only for as long as the limits actually require"""
+        wait = self.reserve(recipient)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waited_ms": round(self.waited_total * 1000, 2),
+                "tracked_recipients": len(self._recipients),
+            }
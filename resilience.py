@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Graph API error codes that mean "slow down" rather than "this request is wrong"
+# https://developers.facebook.com/docs/whatsapp/cloud-api/support/error-codes
+THROTTLE_ERROR_CODES = {4, 80007, 130429, 131048, 131056}
+TRANSIENT_ERROR_CODES = {1, 2, 131000, 131016}
+
+
+def graph_error_code(response):
+    """Meta error code from a response body, or None"""
+    try:
+        return response.json().get("error", {}).get("code")
+    except (ValueError, AttributeError):
+        return None
+
+
+def retry_after_seconds(value):
+    """Seconds from a Retry-After header (delta-seconds or an HTTP-date), or None if unparseable"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:  # "-0000" dates come back naive; HTTP-dates are GMT
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0, throttle_delay=2.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttle_delay = throttle_delay
+
+    def classify(self, response):
+        """Return 'ok', 'throttled', 'transient' or 'fatal' for a Graph API response"""
+        if response.status_code < 400:  # response.ok, for requests and httpx responses alike
+            return "ok"
+        code = graph_error_code(response)
+        if response.status_code == 429 or code in THROTTLE_ERROR_CODES:
+            return "throttled"
+        if response.status_code >= 500 or code in TRANSIENT_ERROR_CODES:
+            return "transient"
+        return "fatal"
+
+    def delay(self, attempt, throttled=False, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        base = self.throttle_delay if throttled else self.base_delay
+        delay = random.uniform(0, min(self.max_delay, base * (2 ** (attempt - 1))))
+        retry_after = retry_after_seconds(retry_after) if retry_after else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Stops calling a failing API for `reset_timeout` seconds after `failure_threshold` failures in a row"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now; in half-open state a single trial call is let through
+        (another one if the last trial has not reported back within `reset_timeout`)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            since = now - (self.opened_at if self.state == "open" else self.trial_at)
+            if since < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+            self.trial_at = now
+            return True
+
+    def retry_in(self):
+        """Seconds until allow() could let a call through (0.0 while closed)"""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            since = time.monotonic() - (self.opened_at if self.state == "open" else self.trial_at)
+            return max(0.0, self.reset_timeout - since)
+
+    def record(self, outcome):
+        """Settle a call allow() let through, by its RetryPolicy.classify() outcome"""
+        if outcome == "transient":
+            self.record_failure()
+        elif outcome == "throttled":
+            self.record_throttled()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_throttled(self):
+        """A 429 says nothing about the API's health: count it neither way, but a throttled
+        half-open trial leaves the breaker open for another `reset_timeout`"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"🚨 Circuit breaker opened after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
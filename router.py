@@ -0,0 +1,218 @@
+import threading
+import time
+
+
+class Router:
+    """Table-driven dispatch of incoming WhatsApp messages to handlers.
+
+    Button ids and text keywords are looked up in dicts, list-row ids by longest prefix in a
+    character trie, so finding the handler costs the same however many flows are registered.
+    Every handler is called as handler(sender, value):
+
+    - button(ids): value is the button id
+    - list_prefix(prefix): value is the rest of the row id after the prefix
+    - list_row: any other row id (value is the whole id)
+    - keyword(words): value is the message text
+    - message_type(types): value is the message ("text" gets the text and catches text without a keyword)
+    - fallback: anything unrouted, including unknown button ids (value is the message)
+
+    Middleware wraps every call as middleware(route, sender, value, call_next) and must
+    return call_next(sender, value); `route` names the matched entry, e.g. "button:menu_button".
+    """
+
+    MAX_UNKNOWN = 100
+
+    def __init__(self, name="router"):
+        self.name = name
+        self._buttons = {}
+        self._prefixes = {}  # char -> child node; a node's None key holds (route, handler)
+        self._keywords = {}
+        self._types = {}
+        self._list_row = None
+        self._fallback = None
+        self._middleware = []
+        self._stats_lock = threading.Lock()
+        self.unknown = {}  # "button:<id>" / "list:<id>" -> count, for the first MAX_UNKNOWN distinct ids
+        self.unknown_total = 0
+
+    # Registration (decorators)
+
+    def button(self, *button_ids):
+        def register(handler):
+            for button_id in button_ids:
+                self._buttons[button_id] = (f"button:{button_id}", handler)
+            return handler
+        return register
+
+    def list_prefix(self, prefix):
+        def register(handler):
+            node = self._prefixes
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = (f"list:{prefix}", handler)
+            return handler
+        return register
+
+    def list_row(self, handler):
+        self._list_row = ("list", handler)
+        return handler
+
+    def keyword(self, *words):
+        def register(handler):
+            for word in words:
+                self._keywords[normalize(word)] = (f"keyword:{normalize(word)}", handler)
+            return handler
+        return register
+
+    def message_type(self, *types):
+        def register(handler):
+            for message_type in types:
+                self._types[message_type] = (f"type:{message_type}", handler)
+            return handler
+        return register
+
+    def fallback(self, handler):
+        self._fallback = ("fallback", handler)
+        return handler
+
+    def use(self, middleware):
+        """Add a middleware; the first one added is the outermost"""
+        self._middleware.append(middleware)
+        return middleware
+
+    # Lookup
+
+    def _match_prefix(self, row_id):
+        node = self._prefixes
+        match = None
+        for position, char in enumerate(row_id):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                match = (node[None], position + 1)
+        if match is None:
+            return None, row_id
+        (route, handler), length = match
+        return (route, handler), row_id[length:]
+
+    def resolve(self, message):
+        """(route, handler, value) for a message; route is None when nothing matches"""
+        interactive = message.get("interactive")
+        if interactive is not None:
+            if "button_reply" in interactive:
+                button_id = interactive["button_reply"].get("id", "")
+                entry = self._buttons.get(button_id)
+                if entry is not None:
+                    return entry[0], entry[1], button_id
+                self._count_unknown(f"button:{button_id}")
+            elif "list_reply" in interactive:
+                row_id = interactive["list_reply"].get("id", "")
+                entry, rest = self._match_prefix(row_id)
+                if entry is None:
+                    entry = self._list_row
+                if entry is not None:
+                    return entry[0], entry[1], rest
+                self._count_unknown(f"list:{row_id}")
+        else:
+            message_type = message.get("type") or ("text" if "text" in message else None)
+            if message_type == "text":
+                text = message.get("text", {}).get("body", "")
+                entry = self._keywords.get(normalize(text))
+                if entry is None:
+                    entry = self._types.get("text")
+                if entry is not None:
+                    return entry[0], entry[1], text
+            else:
+                entry = self._types.get(message_type)
+                if entry is not None:
+                    return entry[0], entry[1], message
+        if self._fallback is None:
+            return None, None, message
+        return self._fallback[0], self._fallback[1], message
+
+    def _count_unknown(self, key):
+        with self._stats_lock:
+            self.unknown_total += 1
+            if key in self.unknown or len(self.unknown) < self.MAX_UNKNOWN:
+                self.unknown[key] = self.unknown.get(key, 0) + 1
+        print(f"⚠️ {self.name}: no handler for {key}")
+
+    # Dispatch
+
+    def dispatch(self, sender, message):
+        """Run the handler for one message; returns the matched route name (None if unrouted)"""
+        route, handler, value = self.resolve(message)
+        if handler is None:
+            return None
+        self._call(0, route, handler, sender, value)
+        return route
+
+    def _call(self, depth, route, handler, sender, value):
+        if depth == len(self._middleware):
+            return handler(sender, value)
+        return self._middleware[depth](
+            route, sender, value, lambda s, v: self._call(depth + 1, route, handler, s, v)
+        )
+
+    def routes(self):
+        """Every registered route name"""
+        names = [route for route, _ in self._buttons.values()]
+        stack = [self._prefixes]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    names.append(child[0])
+                else:
+                    stack.append(child)
+        names += [route for route, _ in self._keywords.values()]
+        names += [route for route, _ in self._types.values()]
+        names += [entry[0] for entry in (self._list_row, self._fallback) if entry is not None]
+        return names
+
+    def stats(self):
+        with self._stats_lock:
+            unknown = dict(self.unknown)
+        return {"routes": len(self.routes()), "unknown_total": self.unknown_total, "unknown": unknown}
+
+
+def normalize(text):
+    """Keyword form of a text: lower case without surrounding spaces and punctuation"""
+    return text.strip().lower().strip("!.?, ")
+
+
+class HandlerTimings:
+    """Middleware recording calls, errors and latency per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}  # route -> [calls, errors, total seconds, max seconds]
+
+    def __call__(self, route, sender, value, call_next):
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = call_next(sender, value)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                entry = self._routes.setdefault(route, [0, 0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += not ok
+                entry[2] += elapsed
+                entry[3] = max(entry[3], elapsed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                route: {
+                    "calls": calls,
+                    "errors": errors,
+                    "avg_ms": round(total / calls * 1000, 3),
+                    "max_ms": round(longest * 1000, 3),
+                }
+                for route, (calls, errors, total, longest) in self._routes.items()
+            }
@@ -0,0 +1,236 @@
+"""Per-day, per-item and per-customer sales rollups over the order store.
+
+Triggers keep the rollup tables current as orders are inserted; a full rebuild recomputes
+them with NumPy group-bys over columnar arrays. Orders without items (e.g. a bill saved
+after the cart was cleared) are not counted.
+
+    python sales_rollups.py rebuild
+    python sales_rollups.py report --by item --from 2025-04-01 --to 2025-05-01
+"""
+import argparse
+import os
+import sqlite3
+import threading
+
+from order_store import SCHEMA as ORDER_SCHEMA
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales_daily (
+    day TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL,
+    revenue INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales_item_daily (
+    day TEXT NOT NULL,
+    item TEXT NOT NULL,
+    units INTEGER NOT NULL,
+    revenue INTEGER NOT NULL,
+    PRIMARY KEY (day, item)
+);
+CREATE TABLE IF NOT EXISTS sales_customer_daily (
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    orders INTEGER NOT NULL,
+    revenue INTEGER NOT NULL,
+    PRIMARY KEY (day, user_id)
+);
+"""
+
+# The trigger's name carries its version: a changed body gets a new name, installed once by
+# install_trigger() instead of being dropped and recreated by every connection
+TRIGGER = "sales_rollup_order_v2"
+OLD_TRIGGERS = ("sales_rollup_order",)
+TRIGGER_SQL = f"""
+CREATE TRIGGER IF NOT EXISTS {TRIGGER} AFTER INSERT ON orders
+WHEN json_array_length(NEW.items) > 0 BEGIN
+    INSERT INTO sales_daily (day, orders, revenue) VALUES (substr(NEW.timestamp, 1, 10), 1, NEW.total)
+    ON CONFLICT (day) DO UPDATE SET orders = orders + 1, revenue = revenue + excluded.revenue;
+    INSERT INTO sales_customer_daily (day, user_id, orders, revenue)
+    VALUES (substr(NEW.timestamp, 1, 10), coalesce(NEW.user_id, ''), 1, NEW.total)
+    ON CONFLICT (day, user_id) DO UPDATE SET orders = orders + 1, revenue = revenue + excluded.revenue;
+    INSERT INTO sales_item_daily (day, item, units, revenue)
+    SELECT substr(NEW.timestamp, 1, 10), json_extract(value, '$.name'), coalesce(json_extract(value, '$.quantity'), 1),
+           coalesce(json_extract(value, '$.price'), 0) * coalesce(json_extract(value, '$.quantity'), 1)
+    FROM json_each(NEW.items) WHERE json_extract(value, '$.name') IS NOT NULL
+    ON CONFLICT (day, item) DO UPDATE SET units = units + excluded.units, revenue = revenue + excluded.revenue;
+END;
+"""
+
+ORDERS_SQL = (
+    "SELECT substr(timestamp, 1, 10), coalesce(user_id, ''), total FROM orders "
+    "WHERE json_array_length(items) > 0"
+)
+# Bill items carry a unit price and a quantity (older orders: one entry per unit, no quantity)
+ITEMS_SQL = (
+    "SELECT substr(o.timestamp, 1, 10), json_extract(j.value, '$.name'), coalesce(json_extract(j.value, '$.price'), 0), "
+    "coalesce(json_extract(j.value, '$.quantity'), 1) "
+    "FROM orders o, json_each(o.items) j WHERE json_extract(j.value, '$.name') IS NOT NULL"
+)
+
+# Report dimension -> (table, key column, measure columns)
+DIMENSIONS = {
+    "day": ("sales_daily", "day", ("orders", "revenue")),
+    "month": ("sales_daily", "substr(day, 1, 7)", ("orders", "revenue")),
+    "item": ("sales_item_daily", "item", ("units", "revenue")),
+    "customer": ("sales_customer_daily", "user_id", ("orders", "revenue")),
+}
+
+
+def group_sum(keys, *values):
+    """Vectorized group-by: (unique keys, count per key, sum of each value array per key)"""
+    import numpy as np
+
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique))
+    sums = [np.bincount(inverse, weights=v, minlength=len(unique)) for v in values]
+    return unique, counts, sums
+
+
+def install_trigger(conn):
+    """Swap older rollup triggers for the current one in a single write transaction, so another
+    process inserting an order meanwhile is counted by exactly one of them"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for name in OLD_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(TRIGGER_SQL)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class SalesRollups:
+    """Rollup tables living next to the orders in the order store database"""
+
+    def __init__(self, path="orders.sqlite3"):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # a connection must not be used across fork()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(ORDER_SCHEMA)
+            conn.executescript(SCHEMA)
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (TRIGGER,)).fetchone():
+                install_trigger(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def rebuild(self):
+        """Recompute every rollup from the orders table in one transaction; returns orders counted"""
+        import numpy as np
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # no order can slip in between the read and the swap
+        try:
+            rows = conn.execute(ORDERS_SQL).fetchall()
+            days, users, totals = (np.array(column) for column in zip(*rows)) if rows else ([], [], [])
+            item_rows = conn.execute(ITEMS_SQL).fetchall()
+            item_days, items, prices, quantities = (
+                (np.array(column) for column in zip(*item_rows)) if item_rows else ([], [], [], [])
+            )
+
+            conn.execute("DELETE FROM sales_daily")
+            conn.execute("DELETE FROM sales_item_daily")
+            conn.execute("DELETE FROM sales_customer_daily")
+            if rows:
+                day_keys, day_codes = np.unique(days, return_inverse=True)
+                codes, counts, (revenue,) = group_sum(day_codes, totals)
+                conn.executemany(
+                    "INSERT INTO sales_daily (day, orders, revenue) VALUES (?, ?, ?)",
+                    zip(day_keys[codes].tolist(), counts.tolist(), revenue.astype(np.int64).tolist()),
+                )
+
+                # Composite (day, user) key as one int64 code, grouped without building strings
+                user_keys, user_codes = np.unique(users, return_inverse=True)
+                codes, counts, (revenue,) = group_sum(day_codes.astype(np.int64) * len(user_keys) + user_codes, totals)
+                conn.executemany(
+                    "INSERT INTO sales_customer_daily (day, user_id, orders, revenue) VALUES (?, ?, ?, ?)",
+                    zip(day_keys[codes // len(user_keys)].tolist(), user_keys[codes % len(user_keys)].tolist(),
+                        counts.tolist(), revenue.astype(np.int64).tolist()),
+                )
+            if item_rows:
+                day_keys, day_codes = np.unique(item_days, return_inverse=True)
+                item_keys, item_codes = np.unique(items, return_inverse=True)
+                quantities = quantities.astype(np.int64)
+                codes, _, (units, revenue) = group_sum(
+                    day_codes.astype(np.int64) * len(item_keys) + item_codes, quantities, prices.astype(np.int64) * quantities
+                )
+                conn.executemany(
+                    "INSERT INTO sales_item_daily (day, item, units, revenue) VALUES (?, ?, ?, ?)",
+                    zip(day_keys[codes // len(item_keys)].tolist(), item_keys[codes % len(item_keys)].tolist(),
+                        units.astype(np.int64).tolist(), revenue.astype(np.int64).tolist()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def ensure_built(self):
+        """Build the rollups once for a database whose orders predate the rollup triggers"""
+        conn = self._conn()
+        if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM sales_daily) AND EXISTS (SELECT 1 FROM orders)").fetchone()[0]:
+            return self.rebuild()
+        return 0
+
+    def report(self, by="day", start=None, end=None, limit=100):
+        """Totals grouped by day, month, item or customer for days in [start, end)"""
+        if by not in DIMENSIONS:
+            raise ValueError(f"by must be one of {', '.join(DIMENSIONS)}")
+        table, key, measures = DIMENSIONS[by]
+        where, params = [], []
+        if start:
+            where.append("day >= ?")
+            params.append(start[:10])
+        if end:
+            where.append("day < ?")
+            params.append(end[:10])
+        sql = f"SELECT {key}, {', '.join(f'SUM({m})' for m in measures)} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" GROUP BY {key}"
+        sql += f" ORDER BY {key}" if by in ("day", "month") else " ORDER BY 3 DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+        rows = self._conn().execute(sql, params).fetchall()
+        return [dict(zip((by,) + measures, row)) for row in rows]
+
+    def totals(self, start=None, end=None):
+        rows = self.report("month", start, end, limit=10 ** 6)
+        return {
+            "orders": sum(row["orders"] for row in rows),
+            "revenue": sum(row["revenue"] for row in rows),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales rollups over the order store")
+    parser.add_argument("command", choices=("rebuild", "report"))
+    parser.add_argument("--db", default="orders.sqlite3")
+    parser.add_argument("--by", default="day", choices=tuple(DIMENSIONS))
+    parser.add_argument("--from", dest="start", help="first day (YYYY-MM-DD), inclusive")
+    parser.add_argument("--to", dest="end", help="last day (YYYY-MM-DD), exclusive")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    rollups = SalesRollups(args.db)
+    if args.command == "rebuild":
+        print(f"✅ Rebuilt rollups from {rollups.rebuild()} order(s)")
+        return
+    rows = rollups.report(args.by, args.start, args.end, args.limit)
+    measures = DIMENSIONS[args.by][2]
+    print(f"{args.by:<24}" + "".join(f"{m:>12}" for m in measures))
+    for row in rows:
+        print(f"{str(row[args.by]):<24}" + "".join(f"{row[m]:>12}" for m in measures))
+    totals = rollups.totals(args.start, args.end)
+    print(f"\n🧾 {totals['orders']} order(s), ₹{totals['revenue']} revenue")
+
+
+if __name__ == "__main__":
+    main()
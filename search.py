@@ -0,0 +1,69 @@
+"""Typo-tolerant product search: a trigram inverted index over the catalog"""
+import re
+from collections import Counter
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def trigrams(word):
+    """Trigrams of a word padded so prefixes and short words still produce some ("  a", " ab", "abc", ...)"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Inverted index trigram -> product positions, built once per catalog snapshot.
+
+    Each query word is scored against each candidate's words by trigram overlap (Dice
+    coefficient), so "scraf" still finds the scarf; exact words from the product name score
+    a bonus. Only products sharing at least one trigram with the query are looked at.
+    """
+
+    def __init__(self, products, min_score=0.3):
+        self.products = tuple(products)
+        self.min_score = min_score
+        self._postings = {}
+        self._word_trigrams = []  # per product: {word: trigrams} for name/section/description words
+        self._name_words = []
+        for position, product in enumerate(self.products):
+            name_words = set(words(product.name))
+            all_words = name_words | set(words(product.section)) | set(words(product.description))
+            self._name_words.append(name_words)
+            self._word_trigrams.append({word: trigrams(word) for word in all_words})
+            for word_trigrams in self._word_trigrams[-1].values():
+                for trigram in word_trigrams:
+                    self._postings.setdefault(trigram, set()).add(position)
+
+    def search(self, query, limit=10):
+        """Products ranked best first (at most `limit`)"""
+        query_words = words(query)
+        if not query_words:
+            return []
+        scores = Counter()
+        for word in query_words:
+            query_trigrams = trigrams(word)
+            candidates = set()
+            for trigram in query_trigrams:
+                candidates.update(self._postings.get(trigram, ()))
+            for position in candidates:
+                best = 0.0
+                for product_trigrams in self._word_trigrams[position].values():
+                    shared = len(query_trigrams & product_trigrams)
+                    if shared:
+                        best = max(best, 2 * shared / (len(query_trigrams) + len(product_trigrams)))
+                if word in self._name_words[position]:
+                    best += 0.5
+                scores[position] += best
+        ranked = []
+        for position, score in scores.most_common():
+            score /= len(query_words)
+            if score < self.min_score:
+                break
+            ranked.append(self.products[position])
+            if len(ranked) >= limit:
+                break
+        return ranked
@@ -0,0 +1,303 @@
+"""Per-customer session state (carts, payment references) with idle expiry and bounded size.
+
+Two backends share one interface: MemorySessionStore (LRU + TTL, in this process) and
+SQLiteSessionStore (shared by every process on the host). SQLite values must be
+JSON-serializable, or objects of a `value_type` with to_dict() / from_dict().
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def size_of(value):
+    """Approximate bytes held by a value and everything it contains"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(size_of(k) + size_of(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(size_of(v) for v in value)
+    else:
+        for slot in getattr(type(value), "__slots__", ()):
+            if hasattr(value, slot):
+                size += size_of(getattr(value, slot))
+    return size
+
+
+class SessionStore:
+    """Interface: a key/value map whose entries expire after `ttl` seconds without access"""
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def update(self, key, func, default=None):
+        """Atomically replace the value with func(current value or default) and return it"""
+        raise NotImplementedError
+
+    def items(self):
+        """Snapshot of the live (key, value) pairs"""
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        self.delete(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU with idle expiry; evicts least recently used entries past max_entries or max_bytes"""
+
+    def __init__(self, ttl=86400, max_entries=100000, max_bytes=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def _store(self, key, value, now):
+        self._remove(key)
+        size = size_of(key) + size_of(value)
+        self._entries[key] = (value, now + self.ttl, size)
+        self.bytes += size
+        self._evict(now)
+
+    def _evict(self, now):
+        # Expired entries first (oldest access at the front), then plain LRU order
+        while self._entries:
+            key, (_, expires_at, _) = next(iter(self._entries.items()))
+            over = len(self._entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes)
+            if expires_at <= now:
+                self.expirations += 1
+            elif over:
+                self.evictions += 1
+            else:
+                return
+            self._remove(key)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                return default
+            self._entries[key] = (entry[0], now + self.ttl, entry[2])
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value, time.time())
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def update(self, key, func, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            value = func(entry[0] if entry is not None else default)
+            self._store(key, value, now)
+            return value
+
+    def items(self):
+        now = time.time()
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items() if entry[1] > now]
+
+    def size(self, key):
+        """Bytes accounted to one key (0 if absent)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (namespace, expires_at);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a WAL-mode SQLite file, so every worker process sees the same carts"""
+
+    def __init__(self, path="sessions.sqlite3", namespace="default", ttl=86400, max_entries=100000,
+                 purge_interval=60, value_type=None):
+        self.path = path
+        self.value_type = value_type
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # a connection must not be used across fork()
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SQLITE_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _read(self, conn, key, now):
+        row = conn.execute(
+            "SELECT value FROM sessions WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, key, now),
+        ).fetchone()
+        return self._decode(row[0]) if row is not None else None
+
+    def _decode(self, text):
+        value = json.loads(text)
+        return self.value_type.from_dict(value) if self.value_type is not None else value
+
+    def _write(self, conn, key, value, now):
+        if self.value_type is not None:
+            value = value.to_dict()
+        encoded = json.dumps(value, ensure_ascii=False)
+        conn.execute(
+            "INSERT INTO sessions (namespace, key, value, size, expires_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+            "expires_at = excluded.expires_at",
+            (self.namespace, key, encoded, len(key) + len(encoded.encode("utf-8")), now + self.ttl),
+        )
+
+    def _maintain(self, conn, now):
+        """Drop expired rows, then the least recently used past max_entries (at most every purge_interval)"""
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        self.expirations += conn.execute(
+            "DELETE FROM sessions WHERE namespace = ? AND expires_at <= ?", (self.namespace, now)
+        ).rowcount
+        self.evictions += conn.execute(
+            "DELETE FROM sessions WHERE namespace = ? AND key IN ("
+            "SELECT key FROM sessions WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries),
+        ).rowcount
+
+    def get(self, key, default=None):
+        conn = self._conn()
+        now = time.time()
+        value = self._read(conn, key, now)
+        if value is None:
+            return default
+        # Sliding expiry: every read extends the session
+        conn.execute(
+            "UPDATE sessions SET expires_at = ? WHERE namespace = ? AND key = ?",
+            (now + self.ttl, self.namespace, key),
+        )
+        return value
+
+    def set(self, key, value):
+        conn = self._conn()
+        now = time.time()
+        self._write(conn, key, value, now)
+        self._maintain(conn, now)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def update(self, key, func, default=None):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")  # read-modify-write under the database write lock
+        try:
+            current = self._read(conn, key, now)
+            value = func(current if current is not None else default)
+            self._write(conn, key, value, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._maintain(conn, now)
+        return value
+
+    def items(self):
+        rows = self._conn().execute(
+            "SELECT key, value FROM sessions WHERE namespace = ? AND expires_at > ?", (self.namespace, time.time())
+        )
+        return [(key, self._decode(value)) for key, value in rows]
+
+    def size(self, key):
+        row = self._conn().execute(
+            "SELECT size FROM sessions WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        return row[0] if row is not None else 0
+
+    def stats(self):
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, time.time()),
+        ).fetchone()
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "bytes": size,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def create_session_store(backend, namespace, ttl, max_entries, path="sessions.sqlite3", max_bytes=None,
+                         value_type=None):
+    if backend == "memory":
+        return MemorySessionStore(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, namespace=namespace, ttl=ttl, max_entries=max_entries, value_type=value_type)
+    raise ValueError(f"Unknown session backend: {backend}")
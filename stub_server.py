@@ -0,0 +1,196 @@
+"""Local stand-in for the Graph API and Razorpay payment links, for load testing the bot.
+
+    python stub_server.py --port 8081 --latency lognormal:80,0.5 --error-rate 0.01 --throttle-rate 0.02
+
+then start the app against it:
+
+    GRAPH_API_BASE=http://127.0.0.1:8081 RAZORPAY_BASE_URL=http://127.0.0.1:8081 python gateway.py
+
+With --pay-webhook, every created payment link is "paid" after --pay-delay seconds by
+posting a payment_link.paid event to the app, so the whole checkout flow can be exercised.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import Request, urlopen
+
+MESSAGES_PATH = re.compile(r"^/v[\d.]+/[^/]+/messages$")
+MEDIA_PATH = re.compile(r"^/v[\d.]+/[^/]+/media$")
+PAYMENT_LINKS_PATH = re.compile(r"^/v1/payment_links/?$")
+
+
+def parse_latency(spec):
+    """Build a sampler (returning seconds) from fixed:MS, uniform:LO,HI, exp:MEAN or lognormal:MEDIAN,SIGMA"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0]) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class StubState:
+    def __init__(self, args):
+        self.args = args
+        self.graph_latency = parse_latency(args.latency)
+        self.payment_latency = parse_latency(args.payment_latency or args.latency)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    state = None
+
+    def log_message(self, format, *args):
+        if self.state.args.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _inject_failure(self, razorpay=False):
+        """Maybe answer with a 429 or a 5xx instead of success; True if a failure was sent"""
+        args = self.state.args
+        roll = random.random()
+        if roll < args.throttle_rate:
+            self.state.count("throttled")
+            if razorpay:
+                error = {"code": "BAD_REQUEST_ERROR", "description": "Too many requests"}
+            else:
+                error = {"message": "Rate limit hit", "code": 130429}
+            self._reply(429, {"error": error}, {"Retry-After": "1"})
+            return True
+        if roll < args.throttle_rate + args.error_rate:
+            self.state.count("errors")
+            if razorpay:
+                error = {"code": "SERVER_ERROR", "description": "The server encountered an error"}
+            else:
+                error = {"message": "Service temporarily unavailable", "code": 2}
+            self._reply(500, {"error": error})
+            return True
+        return False
+
+    def do_HEAD(self):
+        self._reply(200, {})
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.state.lock:
+                return self._reply(200, dict(self.state.counts))
+        self._reply(200, {"status": "stub"})
+
+    def do_POST(self):
+        body = self._read_body()
+        path = self.path.split("?")[0]
+
+        if MESSAGES_PATH.match(path):
+            time.sleep(self.state.graph_latency())
+            if self._inject_failure():
+                return
+            self.state.count("messages")
+            to = json.loads(body or b"{}").get("to")
+            return self._reply(200, {
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": to, "wa_id": to}],
+                "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}],
+            })
+
+        if MEDIA_PATH.match(path):
+            time.sleep(self.state.graph_latency())
+            if self._inject_failure():
+                return
+            self.state.count("media")
+            return self._reply(200, {"id": str(random.randint(10 ** 15, 10 ** 16))})
+
+        if PAYMENT_LINKS_PATH.match(path):
+            time.sleep(self.state.payment_latency())
+            if self._inject_failure(razorpay=True):
+                return
+            self.state.count("payment_links")
+            request_data = json.loads(body or b"{}")
+            link_id = f"plink_{uuid.uuid4().hex[:14]}"
+            link = {
+                "id": link_id,
+                "amount": request_data.get("amount", 0),
+                "currency": request_data.get("currency", "INR"),
+                "reference_id": request_data.get("reference_id"),
+                "status": "created",
+                "short_url": f"http://{self.headers.get('Host')}/pl/{link_id}",
+            }
+            if self.state.args.pay_webhook:
+                threading.Timer(self.state.args.pay_delay, pay_link, args=(self.state, link)).start()
+            return self._reply(200, link)
+
+        self._reply(404, {"error": {"message": f"Unknown path {path}", "code": 100}})
+
+
+def pay_link(state, link):
+    """Send the app the payment_link.paid event Razorpay would send"""
+    event = {
+        "event": "payment_link.paid",
+        "payload": {"payment_link": {"entity": dict(link, status="paid")}},
+    }
+    request = Request(
+        state.args.pay_webhook, data=json.dumps(event).encode("utf-8"),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    try:
+        urlopen(request, timeout=10).read()
+        state.count("payments_paid")
+    except OSError as e:
+        print(f"⚠️ Payment webhook failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Graph API / Razorpay server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", default="fixed:0", help="Graph API latency, e.g. lognormal:80,0.5")
+    parser.add_argument("--payment-latency", help="Razorpay latency (defaults to --latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--pay-webhook", help="app URL to post payment_link.paid events to")
+    parser.add_argument("--pay-delay", type=float, default=1.0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args)
+    # The default listen backlog (5) resets connections when an async client opens many at once
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"🧪 Stub Graph API / Razorpay listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
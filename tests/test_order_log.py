@@ -0,0 +1,132 @@
+"""Crash recovery and group commit of order_log.OrderLog"""
+import os
+import threading
+import time
+
+import order_log
+from order_log import OFFSET, OrderLog
+
+
+def make_log(tmp_path, records=3, **options):
+    log = OrderLog(str(tmp_path / "orders.ndjson"), fsync="none", **options)
+    for i in range(records):
+        log.append({"order": i})
+    return log
+
+
+def test_torn_last_record_is_dropped_on_reopen(tmp_path):
+    log = make_log(tmp_path)
+    log.close()
+    with open(log.path, "ab") as f:
+        f.write(b'{"order": 3, "ite')  # crash in the middle of write()
+
+    reopened = OrderLog(log.path, fsync="none")
+    assert len(reopened) == 3
+    with open(log.path, "rb") as f:
+        assert f.read().endswith(b"}\n")
+    assert reopened.append({"order": 3}) == 3
+    assert reopened.get(3) == {"order": 3}
+    assert [record["order"] for record in reopened] == [0, 1, 2, 3]
+
+
+def test_truncated_log_drops_index_entries_past_the_end(tmp_path):
+    log = make_log(tmp_path)
+    log.close()
+    size = os.path.getsize(log.path)
+    os.truncate(log.path, size - 5)  # the last record is torn, but the index already points at it
+
+    reopened = OrderLog(log.path, fsync="none")
+    assert len(reopened) == 2
+    assert os.path.getsize(log.index_path) == 2 * OFFSET.size
+    assert reopened.get(1) == {"order": 1}
+    assert reopened.append({"order": "next"}) == 2
+    assert reopened.get(2) == {"order": "next"}
+
+
+def test_index_entries_missing_after_a_crash_are_rebuilt(tmp_path):
+    log = make_log(tmp_path, records=5)
+    log.close()
+    os.truncate(log.index_path, 2 * OFFSET.size)  # crash between the log write and the index write
+
+    reopened = OrderLog(log.path, fsync="none")
+    assert len(reopened) == 5
+    assert os.path.getsize(log.index_path) == 5 * OFFSET.size
+    assert [reopened.get(seq) for seq in range(5)] == [{"order": i} for i in range(5)]
+
+
+def test_a_partial_index_entry_is_discarded(tmp_path):
+    log = make_log(tmp_path)
+    log.close()
+    with open(log.index_path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    reopened = OrderLog(log.path, fsync="none")
+    assert len(reopened) == 3
+    assert os.path.getsize(log.index_path) == 3 * OFFSET.size
+
+
+def test_concurrent_appends_share_fsyncs_and_get_their_own_sequence_numbers(tmp_path, monkeypatch):
+    log = OrderLog(str(tmp_path / "orders.ndjson"), fsync="group", group_window=0.05)
+    synced_sizes = []  # log size at each fsync of the log file
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        if fd == log._fd:
+            synced_sizes.append(os.fstat(fd).st_size)
+        real_fsync(fd)
+
+    monkeypatch.setattr(order_log.os, "fsync", fsync)
+
+    appenders = 16
+    barrier = threading.Barrier(appenders)
+    results = {}
+
+    def append(i):
+        barrier.wait()
+        seq = log.append({"appender": i})
+        # Durable before append() returned: some fsync covered the record's last byte
+        end = log._offsets[seq] + len(log._read_line(log._offsets[seq]))
+        results[i] = (seq, any(size >= end for size in list(synced_sizes)))
+
+    threads = [threading.Thread(target=append, args=(i,)) for i in range(appenders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(seq for seq, _ in results.values()) == list(range(appenders))
+    assert all(durable for _, durable in results.values())
+    assert all(log.get(seq) == {"appender": i} for i, (seq, _) in results.items())
+    assert 1 <= log.fsyncs < appenders  # shared, not one per append
+
+
+def test_group_commit_waits_for_an_fsync_started_before_the_append(tmp_path, monkeypatch):
+    log = OrderLog(str(tmp_path / "orders.ndjson"), fsync="group", group_window=0)
+    real_fsync = os.fsync
+    in_fsync = threading.Event()
+    release = threading.Event()
+
+    def slow_fsync(fd):
+        if fd == log._fd and not release.is_set():
+            in_fsync.set()
+            release.wait(5)
+        real_fsync(fd)
+
+    monkeypatch.setattr(order_log.os, "fsync", slow_fsync)
+
+    first = threading.Thread(target=log.append, args=({"order": 0},))
+    first.start()
+    assert in_fsync.wait(5)
+
+    # Written while the first fsync is in flight: that fsync does not cover it
+    done = threading.Event()
+    second = threading.Thread(target=lambda: (log.append({"order": 1}), done.set()))
+    second.start()
+    time.sleep(0.1)
+    assert not done.is_set()
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert done.is_set()
+    assert log.fsyncs == 2
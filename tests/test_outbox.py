@@ -0,0 +1,179 @@
+"""Claiming, leases and retry bookkeeping of outbox.Outbox"""
+import sqlite3
+import time
+
+import pytest
+
+from outbox import Outbox
+from resilience import CircuitBreaker, RetryPolicy
+
+
+class Response:
+    def __init__(self, status_code=200, text="{}"):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return {}
+
+
+class FakeClient:
+    """Answers each send with the next of `responses` (None: unreachable or rejected)"""
+
+    def __init__(self, *responses, breaker=None):
+        self.responses = list(responses)
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = breaker or CircuitBreaker()
+        self.sent = []
+
+    def send(self, payload, label="message", to=None):
+        self.sent.append((to, label))
+        response = self.responses.pop(0) if self.responses else Response()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def make_outbox(tmp_path, client, **options):
+    return Outbox(str(tmp_path / "outbox.sqlite3"), client, **options)
+
+
+def rows(outbox):
+    return outbox._conn().execute("SELECT label, status, attempts FROM outbox ORDER BY id").fetchall()
+
+
+def deliver_next(outbox):
+    row = outbox._claim()
+    assert row is not None
+    outbox._deliver(*row)
+
+
+def test_claim_keeps_each_recipients_messages_in_order(tmp_path):
+    outbox = make_outbox(tmp_path, FakeClient())
+    outbox.put({"to": "1"}, label="first")
+    outbox.put({"to": "1"}, label="second")
+    outbox.put({"to": "2"}, label="other")
+
+    assert outbox._claim()[2] == "first"
+    assert outbox._claim()[2] == "other"  # "second" waits while "first" is in flight
+    assert outbox._claim() is None
+
+
+def test_stale_sending_rows_are_reclaimed(tmp_path):
+    outbox = make_outbox(tmp_path, FakeClient(), lease=60)
+    outbox.put({"to": "1"}, label="abandoned")
+    outbox.put({"to": "1"}, label="next")
+    abandoned = outbox._claim()  # the process sending it dies here
+    assert outbox._claim() is None  # the recipient stays blocked while the lease runs
+
+    outbox._conn().execute("UPDATE outbox SET claimed_at = ? WHERE id = ?", (time.time() - 61, abandoned[0]))
+    reclaimed = outbox._claim()
+    assert reclaimed[0] == abandoned[0]
+    assert reclaimed[4] == 1  # the lost attempt still counts
+
+
+def test_outboxes_without_claimed_at_are_migrated(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, dedup_key TEXT NOT NULL UNIQUE, recipient TEXT,
+            label TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, created_at REAL NOT NULL,
+            sent_at REAL, last_error TEXT
+        );
+        INSERT INTO outbox (dedup_key, recipient, label, payload, status, next_attempt_at, created_at)
+        VALUES ('old', '1', 'stuck', '{}', 'sending', 0, 0);
+    """)
+    conn.close()
+
+    outbox = Outbox(path, FakeClient(), lease=60)
+    assert outbox._claim()[2] == "stuck"  # no claimed_at: reclaimed as abandoned
+
+
+def test_a_send_that_raises_is_retried_later(tmp_path):
+    outbox = make_outbox(tmp_path, FakeClient(RuntimeError("boom")))
+    outbox.put({"to": "1"}, label="message")
+
+    row = outbox._claim()
+    with pytest.raises(RuntimeError):
+        outbox._deliver(*row)
+    outbox._retry_later(row[0], row[2], row[4], row[5], "RuntimeError: boom")  # what _run does
+
+    status, attempts, next_attempt_at = outbox._conn().execute(
+        "SELECT status, attempts, next_attempt_at FROM outbox"
+    ).fetchone()
+    assert (status, attempts) == ("pending", 1)
+    assert next_attempt_at >= time.time() + outbox.base_delay / 2 - 1
+
+
+def test_sender_thread_survives_a_raising_send(tmp_path):
+    client = FakeClient(RuntimeError("boom"))
+    outbox = make_outbox(tmp_path, client, workers=1, base_delay=0.01, max_delay=0.01, poll_interval=0.01)
+    outbox.put({"to": "1"}, label="message")
+    outbox.start()
+
+    deadline = time.time() + 5
+    while outbox.stats().get("sent") != 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert outbox.stats() == {"sent": 1}
+    assert len(client.sent) == 2
+
+
+def test_transient_failures_back_off_in_minutes_and_never_die_young(tmp_path):
+    client = FakeClient(*[Response(503)] * 20)
+    outbox = make_outbox(tmp_path, client)
+    outbox.put({"to": "1"}, label="message")
+
+    for _ in range(20):
+        outbox._conn().execute("UPDATE outbox SET next_attempt_at = 0")
+        deliver_next(outbox)
+    status, attempts, delay = outbox._conn().execute(
+        "SELECT status, attempts, next_attempt_at - ? FROM outbox", (time.time(),)
+    ).fetchone()
+    assert (status, attempts) == ("pending", 20)
+    assert outbox.max_delay / 2 - 1 <= delay <= outbox.max_delay
+
+
+def test_only_fatal_answers_or_old_age_are_dead(tmp_path):
+    outbox = make_outbox(tmp_path, FakeClient(Response(400), Response(503)), max_age=3600)
+    outbox.put({"to": "1"}, label="fatal")
+    outbox.put({"to": "2"}, label="too_old")
+    outbox._conn().execute("UPDATE outbox SET created_at = ? WHERE label = 'too_old'", (time.time() - 3601,))
+
+    deliver_next(outbox)
+    deliver_next(outbox)
+    assert rows(outbox) == [("fatal", "dead", 1), ("too_old", "dead", 1)]
+
+
+def test_a_send_rejected_by_the_open_breaker_spends_no_attempt(tmp_path):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    outbox = make_outbox(tmp_path, FakeClient(None, breaker=breaker))
+    outbox.put({"to": "1"}, label="bill")
+    row = outbox._claim()
+    breaker.record_failure()  # another sender trips the breaker; this send is rejected
+
+    outbox._deliver(*row)
+    status, attempts, wait = outbox._conn().execute(
+        "SELECT status, attempts, next_attempt_at - ? FROM outbox", (time.time(),)
+    ).fetchone()
+    assert (status, attempts) == ("pending", 0)
+    assert 29 <= wait <= 30  # back once the breaker lets a trial call through
+
+
+def test_senders_hold_back_while_the_breaker_is_open(tmp_path):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.3)
+    client = FakeClient(breaker=breaker)
+    outbox = make_outbox(tmp_path, client, workers=1, poll_interval=0.01)
+    outbox.put({"to": "1"}, label="bill")
+    breaker.record_failure()
+    outbox.start()
+
+    time.sleep(0.15)
+    assert client.sent == []
+    assert rows(outbox) == [("bill", "pending", 0)]
+
+    deadline = time.time() + 5
+    while outbox.stats().get("sent") != 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert rows(outbox) == [("bill", "sent", 1)]
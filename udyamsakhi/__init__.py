@@ -0,0 +1,12 @@
+"""The WhatsApp shop: one app factory behind gateway.py, seller.py, payments.py, menuinc.py and image-test.py.
+
+    from udyamsakhi import create_app
+    app = create_app(checkout="link")
+
+Clients, stores, the catalog and the Razorpay SDK are imported and built on first use
+(udyamsakhi.services), so importing an app is cheap; prepare() and start_worker() do the
+startup work for the servers (gunicorn.conf.py, asgi.py, the dev server).
+"""
+from .app import create_app, prepare, ready, run, start_worker
+from .services import services
+
@@ -0,0 +1,243 @@
+"""The Flask app factory, and the startup steps every server mode shares"""
+import hmac
+import json
+import os
+import threading
+
+from flask import Flask, jsonify, request
+
+from cart import rupees
+from http_cache import cached_json, not_modified, query_etag
+from webhook_batch import process_batch
+
+from . import config
+from .flows import Shop, complete_payment
+from .messages import WELCOME_IMAGE_URL, warm_templates
+from .services import services
+
+ready = threading.Event()
+_prepared_pid = None
+_started_pid = None
+
+
+def seller_only():
+    """None if the request carries the seller's ORDERS_API_TOKEN as a bearer token, else the error response"""
+    if not config.ORDERS_API_TOKEN:
+        return jsonify({"error": "set ORDERS_API_TOKEN to enable this endpoint"}), 403
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), config.ORDERS_API_TOKEN.encode()):
+        return jsonify({"error": "unauthorized"}), 401, {"WWW-Authenticate": "Bearer"}
+    return None
+
+
+def create_app(checkout="razorpay", record_bills=True, name="webhook"):
+    """A Flask app serving the shop (see flows.Shop for the options).
+
+    Nothing heavy happens here: clients, stores and the catalog are built when first used,
+    or up front by prepare().
+    """
+    app = Flask(__name__)
+    shop = Shop(checkout=checkout, record_bills=record_bills, name=name)
+    app.extensions["shop"] = shop
+
+    @app.route("/webhook", methods=["GET", "POST"])
+    def webhook():
+        if request.method == "GET":
+            verify_token = request.args.get("hub.verify_token")
+            challenge = request.args.get("hub.challenge")
+            if verify_token == config.VERIFY_TOKEN:
+                return challenge
+            return "Invalid verification token", 403
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("entry"), list):
+            return "Invalid payload", 400
+
+        print(f"📩 Incoming Webhook Data: {json.dumps(data, indent=2)}")
+
+        # Per-sender FIFO on a shard; different customers run in parallel
+        handle = shop.dispatcher.dispatch if config.WEBHOOK_ASYNC else shop.handle_message
+        processed, failed = process_batch(data, handle)
+        services.batch_stats.record(processed + failed)  # outcomes are counted by Shop.handle_message
+        verb = "Queued" if config.WEBHOOK_ASYNC else "Processed"
+        print(f"📦 {verb} {processed} message(s) from delivery" + (f", {failed} failed" if failed else ""))
+
+        return "OK", 200
+
+    @app.route("/webhook/stats", methods=["GET"])
+    def webhook_stats():
+        return jsonify({
+            "async": config.WEBHOOK_ASYNC,
+            "dispatcher": shop.dispatcher.stats(),
+            "batches": services.batch_stats.stats(),
+            "whatsapp": services.whatsapp.stats(),
+            "rate_limiter": services.rate_limiter.stats(),
+            "outbox": services.outbox.stats() if config.WA_OUTBOX else None,
+            "media_cache": services.media_cache.stats(),
+            "order_log": services.order_log.stats(),
+            "order_store": services.order_store.stats(),
+            "carts": services.user_selections.stats(),
+            "payment_refs": services.reference_map.stats(),
+            "user_locks": services.user_locks.stats(),
+            "catalog": services.catalog.stats(),
+            "router": dict(shop.router.stats(), handlers=shop.handler_timings.stats()),
+            "services": services.built(),
+        })
+
+    @app.route("/", methods=["GET"])
+    def home():
+        return jsonify({"status": True, "message": 'WhatsApp Bot is Running 🚀'})
+
+    @app.route("/ready", methods=["GET"])
+    def readiness():
+        """200 once this worker's caches and Graph API connections are warm, 503 until then"""
+        if not ready.is_set():
+            return jsonify({"ready": False, "pid": os.getpid()}), 503
+        return jsonify({"ready": True, "pid": os.getpid()})
+
+    @app.route("/orders", methods=["GET"])
+    def list_orders():
+        """Order history, newest first: ?user=&from=&to=(exclusive)&status=paid|unpaid&item=&limit=&cursor="""
+        denied = seller_only()
+        if denied is not None:
+            return denied
+
+        etag = query_etag(services.order_store.version())
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        args = request.args
+        status = args.get("status")
+        if status not in (None, "", "paid", "unpaid"):
+            return jsonify({"error": "status must be paid or unpaid"}), 400
+        try:
+            limit = min(max(int(args.get("limit", 50)), 1), 200)
+            orders, next_cursor = services.order_store.page(
+                user_id=args.get("user"),
+                start=args.get("from"),
+                end=args.get("to"),
+                paid={"paid": True, "unpaid": False}.get(status),
+                item=args.get("item"),
+                cursor=args.get("cursor"),
+                limit=limit,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return cached_json({"orders": orders, "next_cursor": next_cursor}, etag=etag)
+
+    @app.route("/sales", methods=["GET"])
+    def sales_report():
+        """Revenue and counts: ?by=day|month|item|customer&from=&to=(exclusive)&limit="""
+        denied = seller_only()
+        if denied is not None:
+            return denied
+
+        # The rollups move with the orders (triggers), so the newest order id validates them too
+        etag = query_etag(services.order_store.version())
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        args = request.args
+        by = args.get("by", "day")
+        try:
+            limit = min(max(int(args.get("limit", 100)), 1), 1000)
+            rows = services.sales_rollups.report(by, args.get("from"), args.get("to"), limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return cached_json({"by": by, "rows": rows, "totals": services.sales_rollups.totals(args.get("from"), args.get("to"))}, etag=etag)
+
+    if checkout == "razorpay":
+        @app.route('/payment/webhook', methods=['POST'])
+        def payment_webhook():
+            data = request.json
+            print("📩 Incoming Webhook Data:", data)
+
+            event = data.get('event')
+            payload = data.get('payload', {})
+
+            if event == "payment_link.paid":
+                payment_info = payload.get("payment_link", {}).get("entity", {})
+                reference_id = payment_info.get("reference_id")
+                payment_id = payment_info.get("id")
+                amount = rupees(int(payment_info.get("amount", 0)))  # Razorpay amounts are in paise
+
+                user_id = services.reference_map.get(reference_id)
+                if not user_id:
+                    print("⚠️ No matching user found for reference_id:", reference_id)
+                    return '', 200
+
+                complete_payment(user_id, reference_id, payment_id, amount)
+
+            return '', 200
+
+    return app
+
+
+def prepare(wait_for_media=True):
+    """Build every service and warm the caches, once per process tree.
+
+    Under gunicorn this runs in the master (pre_fork hook), so the catalog, search index,
+    pre-serialized payloads and media ids are shared copy-on-write by the workers.
+    """
+    global _prepared_pid
+    if _prepared_pid is not None:
+        return
+    _prepared_pid = os.getpid()
+
+    # Touching a service builds it
+    services.order_log
+    services.order_store  # also builds the sales rollups and imports legacy files
+    services.user_selections
+    services.reference_map
+    services.user_locks
+    catalog = services.catalog.current
+    services.search_index
+    if config.WA_OUTBOX:
+        services.outbox.recover()  # once, before any worker starts sending
+
+    # Upload or renew media ids up front, so every worker starts with them
+    media_cache = services.media_cache
+    media_cache.refresh(wait=wait_for_media)
+    media_cache.refresh([WELCOME_IMAGE_URL] + [p.image for p in catalog.products if p.image], wait=wait_for_media)
+
+    # Static bodies are serialized once; sends only splice in the recipient
+    warm_templates(catalog)
+
+
+def start_worker(warm_up=None):
+    """Start this process's background threads and warm its connections, then flip /ready.
+
+    Threads do not survive fork(), so under gunicorn this runs in each worker (post_fork hook);
+    a dev server or asgi.py calls it once at startup. `warm_up` opens the Graph API connections
+    the process sends on (default: the sync client's; asgi.py passes its async client's).
+    """
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    _started_pid = os.getpid()
+    if _prepared_pid is not None and _prepared_pid != _started_pid:
+        services.after_fork()
+    prepare(wait_for_media=False)
+
+    if config.BILLS_EXPORT_INTERVAL > 0:
+        services.order_log.start_exporter(config.BILLS_EXPORT_PATH, interval=config.BILLS_EXPORT_INTERVAL)
+    if config.CATALOG_RELOAD_INTERVAL > 0:
+        services.catalog.start_watcher(config.CATALOG_RELOAD_INTERVAL)
+    if config.WA_OUTBOX:
+        services.outbox.start(recover=False)  # prepare() recovered
+    services.media_cache.start_refresher()
+
+    def warm():
+        if config.WA_WARM_UP:
+            (warm_up or services.whatsapp.warm_up)()
+        ready.set()
+
+    threading.Thread(target=warm, name="whatsapp-warm-up", daemon=True).start()
+
+
+def run(app):
+    """Development server only; in production run gunicorn -c gunicorn.conf.py <module>:app"""
+    start_worker()
+    app.run(debug=os.getenv("FLASK_DEBUG", "0") == "1", port=int(os.getenv("PORT", "5000")))
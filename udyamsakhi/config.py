@@ -0,0 +1,83 @@
+"""Settings for the WhatsApp shop, read once from the environment (and .env)"""
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+VERIFY_TOKEN = os.getenv("VERIFY_TOKEN")
+WHATSAPP_ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
+PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+
+# Acknowledge-then-process: return 200 to Meta right away and handle messages on worker shards
+WEBHOOK_ASYNC = os.getenv("WEBHOOK_ASYNC", "0") == "1"
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+
+# One pooled keep-alive connection set to graph.facebook.com shared by every send_* helper
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.facebook.com")
+WA_POOL_SIZE = int(os.getenv("WA_POOL_SIZE", str(max(10, WEBHOOK_WORKERS))))
+WA_TIMEOUT = float(os.getenv("WA_TIMEOUT", "10"))
+WA_WARM_UP = os.getenv("WA_WARM_UP", "1") == "1"
+
+# Outbound throughput limits (per business phone number and per customer)
+WA_RATE_PER_SECOND = float(os.getenv("WA_RATE_PER_SECOND", "80"))
+WA_RECIPIENT_RATE = float(os.getenv("WA_RECIPIENT_RATE", str(1 / 6)))
+WA_RECIPIENT_BURST = int(os.getenv("WA_RECIPIENT_BURST", "45"))
+
+# Retry/backoff for throttled and 5xx responses, and a breaker that fails fast during outages
+WA_MAX_ATTEMPTS = int(os.getenv("WA_MAX_ATTEMPTS", "4"))
+WA_BREAKER_THRESHOLD = int(os.getenv("WA_BREAKER_THRESHOLD", "5"))
+WA_BREAKER_RESET = float(os.getenv("WA_BREAKER_RESET", "30"))
+
+# Durable outbox: write every outbound payload to SQLite and let background workers deliver it
+WA_OUTBOX = os.getenv("WA_OUTBOX", "0") == "1"
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.sqlite3")
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+# Seconds a message may stay 'sending' before another sender takes it over; longer than a worst-case send
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "300"))
+# Seconds a message keeps being retried before it is marked dead (fatal 4xx answers give up at once)
+OUTBOX_MAX_AGE = float(os.getenv("OUTBOX_MAX_AGE", "86400"))
+
+# Upload images to WhatsApp once and send the media id instead of making Meta refetch the link
+MEDIA_CACHE = os.getenv("MEDIA_CACHE", "1") == "1"
+MEDIA_INDEX_PATH = os.getenv("MEDIA_INDEX_PATH", "media_index.json")
+
+# Confirmed orders go to an append-only log; bills.json is exported from it periodically
+ORDER_LOG_PATH = os.getenv("ORDER_LOG_PATH", "order_log.ndjson")
+ORDER_LOG_FSYNC = os.getenv("ORDER_LOG_FSYNC", "group")
+BILLS_EXPORT_PATH = os.getenv("BILLS_EXPORT_PATH", "bills.json")
+BILLS_EXPORT_INTERVAL = float(os.getenv("BILLS_EXPORT_INTERVAL", "60"))
+
+# Carts and payment references expire after a period of inactivity instead of living forever
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory" or "sqlite"
+SESSION_PATH = os.getenv("SESSION_PATH", "sessions.sqlite3")
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+CART_TTL = float(os.getenv("CART_TTL", str(24 * 3600)))
+PAYMENT_REF_TTL = float(os.getenv("PAYMENT_REF_TTL", str(7 * 24 * 3600)))
+
+# Several worker processes: SESSION_BACKEND=sqlite shares carts, and a per-customer lock
+# (striped lock files) makes a cart change or the checkout snapshot of it atomic across them
+USER_LOCK_DIR = os.getenv("USER_LOCK_DIR", "locks")
+USER_LOCK_STRIPES = int(os.getenv("USER_LOCK_STRIPES", "64"))
+
+# Products, prices and menu sections come from this file and are reloaded when it changes
+CATALOG_PATH = os.getenv("CATALOG_PATH", "catalog.json")
+CATALOG_RELOAD_INTERVAL = float(os.getenv("CATALOG_RELOAD_INTERVAL", "5"))
+
+# Queryable copy of every order (by customer, time and payment id)
+ORDER_STORE_PATH = os.getenv("ORDER_STORE_PATH", "orders.sqlite3")
+# /orders and /sales expose customers' numbers and addresses: the seller's tools send
+# "Authorization: Bearer <token>"; unset, the routes refuse every request
+ORDERS_API_TOKEN = os.getenv("ORDERS_API_TOKEN")
+
+# Razorpay payment links (checkout="razorpay"); the base URL can point at stub_server.py for load tests
+RAZORPAY_KEY_ID = os.getenv("key_id")
+RAZORPAY_SECRET = os.getenv("key_secret")
+RAZORPAY_BASE_URL = os.getenv("RAZORPAY_BASE_URL")
+RAZORPAY_CALLBACK_URL = os.getenv("RAZORPAY_CALLBACK_URL", "https://4b10-14-139-61-211.ngrok-free.app/payment/webhook")
+
+# Static payment page for checkout="link": the customer pays there and taps "Payment Done"
+PAYMENT_LINK = os.getenv("PAYMENT_LINK", "https://razorpay.me/@sanketmarotisuryawanshi")
+
+SELLER_NUMBER = os.getenv("SELLER_NUMBER", "917719436134")  # 👈 Replace this with actual seller number
@@ -0,0 +1,325 @@
+"""The conversation: routes from buttons, list rows and text to handlers, cart, bill and payment"""
+import threading
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+
+from cart import Cart, format_rupees
+from router import HandlerTimings, Router
+
+from . import config
+from .messages import (
+    MENU_MAX_ROWS, MENU_PAGE_PREFIX, format_line, send_add_more_or_confirm_buttons, send_bill_to_seller,
+    send_contact_info, send_menu, send_message, send_payment_confirmation, send_search_results,
+    send_welcome_message,
+)
+from .services import services
+
+CHECKOUTS = ("razorpay", "link")
+
+# Free text other than a greeting (or "menu", which shows the menu) is treated as a product search
+GREETINGS = {"hi", "hii", "hello", "hey", "hola", "namaste", "start"}
+
+
+class Shop:
+    """The message handling of one app.
+
+    checkout="razorpay" creates a Razorpay payment link per bill and confirms the order from
+    Razorpay's webhook (/payment/webhook); checkout="link" sends the static PAYMENT_LINK and
+    a "Payment Done" button. With record_bills=False that button only thanks the customer;
+    otherwise it also logs the bill and sends it to the seller.
+    """
+
+    def __init__(self, checkout="razorpay", record_bills=True, name="webhook"):
+        if checkout not in CHECKOUTS:
+            raise ValueError(f"checkout must be one of {', '.join(CHECKOUTS)}")
+        self.checkout = checkout
+        self.record_bills = record_bills
+        self.router = build_router(self, name)
+        self.handler_timings = self.router.use(HandlerTimings())
+        self.name = name
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
+
+    @property
+    def dispatcher(self):
+        """Per-sender FIFO shards for WEBHOOK_ASYNC, created with the first delivery"""
+        if self._dispatcher is None:
+            # Concurrent first deliveries must share one shard set, or a sender's messages would race
+            with self._dispatcher_lock:
+                if self._dispatcher is None:
+                    from dispatcher import ShardedDispatcher
+                    self._dispatcher = ShardedDispatcher(
+                        self.handle_message, shards=config.WEBHOOK_WORKERS, name=self.name
+                    )
+        return self._dispatcher
+
+    def handle_message(self, sender, message):
+        # Outbound dedup keys derive from the inbound message id, so a redelivery enqueues nothing twice.
+        # No per-customer lock here: it would be held across every Graph API and Razorpay call, so
+        # only the cart changes themselves take it (add_to_selection, complete_payment)
+        try:
+            with _dedup_scope(message.get("id")):
+                self.router.dispatch(sender, message)
+        except Exception:
+            services.batch_stats.record_outcome(False)
+            raise
+        services.batch_stats.record_outcome(True)
+
+    def generate_bill(self, user_id):
+        if self.checkout == "razorpay":
+            generate_bill(user_id)
+        else:
+            generate_bill_with_link(user_id)
+
+    def on_payment_done(self, user_id):
+        send_message(user_id, "*✅ Payment Confirmed!* Thank you for your order! 🙏")
+        if self.record_bills:
+            save_bill_to_json(user_id)  # Save bill to file here
+
+
+def build_router(shop, name="webhook"):
+    """Button ids, list rows, keywords and message types mapped to handlers; see router.py"""
+    router = Router(name)
+
+    @router.button("menu_button", "add_more")
+    @router.keyword("menu")
+    def on_menu_button(sender, value):
+        send_menu(sender)
+
+    @router.button("contact_button")
+    def on_contact_button(sender, button_id):
+        send_contact_info(sender)
+
+    @router.button("payment_done")
+    def on_payment_done(sender, button_id):
+        shop.on_payment_done(sender)
+
+    @router.button("confirm_order")
+    def on_confirm_order(sender, button_id):
+        shop.generate_bill(sender)
+
+    @router.list_prefix(MENU_PAGE_PREFIX)
+    def on_menu_page(sender, page):
+        # The row id comes back from the client; anything that is not a page number shows page 1
+        try:
+            page = int(page)
+        except ValueError:
+            page = 0
+        send_menu(sender, page)
+
+    @router.list_row
+    def on_product_row(sender, item_id):
+        add_to_selection(sender, item_id)
+
+    @router.keyword(*GREETINGS)
+    @router.fallback
+    def on_greeting(sender, value):
+        send_welcome_message(sender)
+
+    @router.message_type("text")
+    def handle_text(sender, text):
+        text = text.strip()
+        if not text:
+            send_welcome_message(sender)
+            return
+
+        results = services.search_index.search(text, limit=MENU_MAX_ROWS)
+        if not results:
+            send_message(sender, f"🔍 No products found for \"{text[:50]}\". Here is what we have:")
+            send_menu(sender)
+            return
+        send_search_results(sender, text, results)
+
+    return router
+
+
+# Dedup keys and batches only mean something to the outbox; without it sends go straight out
+def _dedup_scope(key):
+    return services.outbox.dedup_scope(key) if config.WA_OUTBOX else nullcontext()
+
+
+def _outbox_batch():
+    return services.outbox.batch() if config.WA_OUTBOX else nullcontext()
+
+
+def _cart_product(catalog, key):
+    """The product for a cart key: an item id, or a product name in carts saved before ids"""
+    product = catalog.get(key)
+    if product is None:
+        product = next((p for p in catalog.products if p.name == key), None)
+    return product
+
+
+def reprice(cart, catalog=None):
+    """The cart at current catalog prices, without products that are no longer sold"""
+    catalog = catalog or services.catalog.current
+    if cart.priced_at is not None and cart.priced_at == catalog.version:
+        return cart  # same catalog as when it was priced: the running total still holds
+    fresh = Cart(priced_at=catalog.version)
+    for key, quantity in cart.items():
+        product = _cart_product(catalog, key)
+        if product is not None:
+            fresh.add(product.id, product.price_paise, quantity)
+    return fresh
+
+
+def cart_lines(cart):
+    """The cart as bill items: name, unit price (₹) and quantity per product"""
+    lines = []
+    for item_id, quantity in cart.items():
+        product = services.catalog.get(item_id)
+        if product is None:  # dropped from the catalog since it was added
+            continue
+        lines.append({"name": product.name, "price": product.price, "quantity": quantity})
+    return lines
+
+
+def add_to_selection(user_id, item_id):
+    catalog = services.catalog.current
+    product = catalog.get(item_id)
+    if product is None:
+        send_message(user_id, "⚠️ Sorry, that item is no longer available.")
+        send_menu(user_id)
+        return
+
+    # A cart priced from an older catalog is repriced first, so its total never mixes price lists
+    with services.user_locks.lock(user_id):
+        services.user_selections.update(
+            user_id, lambda cart: reprice(cart or Cart(), catalog).add(item_id, product.price_paise)
+        )
+    send_add_more_or_confirm_buttons(user_id)
+
+
+def bill_summary(user_id, order_id):
+    """(repriced cart, order summary text); the cart is empty if there is nothing to bill"""
+    cart = reprice(services.user_selections.get(user_id) or Cart())
+    bill_message = f"*✨ Your Order Summary:*\nOrder ID: {order_id}\nUserName: Sanket\nAddress: Bhupeshnagar, Nagpur\n"
+    for item in cart_lines(cart):
+        bill_message += format_line(item) + "\n"
+    bill_message += f"\n*Total: {format_rupees(cart.total_paise)}*"
+    return cart, bill_message
+
+
+def generate_bill(user_id):
+    order_id = str(uuid.uuid4())[:8]  # short reference id
+    cart, bill_message = bill_summary(user_id, order_id)
+    if not cart:
+        send_message(user_id, "*🛒 Your cart is empty!* Please select items from the menu.")
+        return
+
+    services.reference_map.set(order_id, user_id)  # Save mapping for webhook
+
+    # The bill and its payment link are written to the outbox together, so a crash
+    # can never leave the customer with a bill but no link
+    with _outbox_batch():
+        send_message(user_id, bill_message)
+
+        # Razorpay payment link creation
+        try:
+            payment_link_data = {
+                "amount": cart.total_paise,
+                "currency": "INR",
+                "accept_partial": False,
+                "reference_id": order_id,
+                "description": "Mahila Udyam Order Payment",
+                "customer": {
+                    "name": "Sanket",
+                    "contact": user_id,  # Assuming user_id is phone
+                    "email": "demo@example.com"
+                },
+                "notify": {
+                    "sms": False,
+                    "email": False
+                },
+                "callback_url": config.RAZORPAY_CALLBACK_URL
+            }
+
+            response = services.razorpay.payment_link.create(payment_link_data)
+            payment_link = response['short_url']
+
+            send_message(user_id, f"💳 Please make the payment here:\n{payment_link}")
+            send_message(user_id, "📌 Once payment is complete, you’ll get a confirmation automatically.")
+
+        except Exception as e:
+            print("❌ Razorpay error:", e)
+            send_message(user_id, "⚠️ Failed to generate payment link. Please try again later.")
+
+
+def generate_bill_with_link(user_id):
+    """checkout="link": the static payment page, then a button the customer taps once paid"""
+    cart, bill_message = bill_summary(user_id, str(uuid.uuid4())[:8])
+    if not cart:
+        send_message(user_id, "*🛒 Your cart is empty!* Please select items from the menu.")
+        return
+
+    with _outbox_batch():
+        send_message(user_id, bill_message)
+        send_message(user_id, f"💳 Please make the payment here:\n{config.PAYMENT_LINK}")
+        send_payment_confirmation(user_id)
+
+
+def save_bill_to_json(user_id):
+    """Append the latest confirmed order to the order log and send to seller"""
+    cart = reprice(services.user_selections.get(user_id) or Cart())
+    bill_data = {
+        "user_id": user_id,
+        "username": "Sanket",
+        "address": "Bhupeshnagar, Nagpur",
+        "timestamp": datetime.now().isoformat(),
+        "items": cart_lines(cart),
+        "total": cart.total
+    }
+
+    services.order_log.append(bill_data)
+    services.order_store.add(bill_data, source="bill")
+
+    # ✅ Send bill to seller WhatsApp
+    send_bill_to_seller(bill_data)
+
+
+def complete_payment(user_id, reference_id, payment_id, amount):
+    # Take the cart and clear it in one step: a tap on another worker cannot add to a paid
+    # cart, and a retried payment webhook finds it gone
+    with services.user_locks.lock(user_id):
+        cart = services.user_selections.get(user_id)
+        if cart:
+            services.user_selections.delete(user_id)
+    if not cart:
+        send_message(user_id, "⚠️ Your order could not be found after payment.")
+        return
+
+    now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    username = "Sanket"
+    address = "Bhupeshnagar, Nagpur"
+
+    # Format items into dict list for seller function
+    formatted_items = cart_lines(cart)
+
+    # Build `bill_data` dict
+    bill_data = {
+        "username": username,
+        "address": address,
+        "timestamp": now,
+        "items": formatted_items,
+        "total": amount,
+        "payment_id": payment_id
+    }
+
+    # Final message to user
+    receipt = f"""🧾 *Mahila Udyam - Order Receipt*\n
+Order ID: {reference_id}
+Payment ID: {payment_id}
+Date: {now}
+
+Items:\n""" + "\n".join([format_line(i) for i in formatted_items]) + f"\n\n*Total Paid: {format_rupees(round(amount * 100))}*\n✅ Payment Successful."
+
+    # Razorpay retries webhooks, so outbound keys derive from the payment id
+    order_store = services.order_store
+    with _dedup_scope(payment_id), _outbox_batch(), order_store.batch():
+        order_store.add(dict(bill_data, user_id=user_id, reference_id=reference_id), source="payment")
+        send_message(user_id, receipt)
+        save_bill_to_json(user_id)
+
+        # ✅ CALL YOUR FUNCTION TO NOTIFY SELLER
+        send_bill_to_seller(bill_data)
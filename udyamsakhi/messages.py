@@ -0,0 +1,289 @@
+"""Every outbound WhatsApp message of the shop, shared by all the apps"""
+from cart import format_rupees
+
+from . import config
+from .services import services
+
+templates = services.templates
+
+
+def post_message(payload, label, description, to=None):
+    """Send one payload (via the durable outbox when WA_OUTBOX=1) and log the result.
+
+    `payload` is a dict or a pre-rendered template (bytes, with `to` given).
+    """
+    if config.WA_OUTBOX:
+        services.outbox.put(payload, label=label, to=to)
+        print(f"📥 Queued {description} for {to or payload.get('to')}")
+        return True
+
+    # Imported here so requests is only loaded once something is actually sent
+    from whatsapp_client import deferred_sends, response_json
+
+    # Under asgi.py the event loop delivers this after the handler returns, in send order
+    pending = deferred_sends.get()
+    if pending is not None:
+        pending.append((payload, label, description, to))
+        return True
+
+    response = services.whatsapp.send(payload, label=label, to=to)
+    print(f"📤 Sent {description} Response: {response_json(response)}")
+    return response is not None and response.ok
+
+
+def send_message(to, message):
+    payload = {
+        'messaging_product': 'whatsapp',
+        'to': to,
+        'text': {'body': message}
+    }
+
+    post_message(payload, "text", "Message")
+
+
+@templates.register("contact_info")
+def contact_info_body():
+    message = (
+        "*📞 Contact Information:*\n\n"
+        "👩‍💼 *Owner:* Aarti Creations\n"
+        "📍 *Location:* Bhupeshnagar, Nagpur\n"
+        "📱 *Phone:* +91 7719436134\n"
+        "📧 *Email:* support@aarticreations.in\n"
+        "🕒 *Working Hours:* 10 AM - 6 PM (Mon - Sat)"
+    )
+    return {'text': {'body': message}}
+
+def send_contact_info(to):
+    post_message(templates.render("contact_info", to), "contact_info", "Contact Info", to=to)
+
+WELCOME_IMAGE_URL = "https://plus.unsplash.com/premium_photo-1679809447923-b3250fb2a0ce?q=80&w=2071&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D"  # 👈 Replace with your image URL
+
+@templates.register("welcome_image")
+def welcome_image_body():
+    return {
+        "type": "image",
+        "image": services.media_cache.image(WELCOME_IMAGE_URL)
+    }
+
+@templates.register("welcome_buttons")
+def welcome_buttons_body():
+    return {
+        "type": "interactive",
+        "interactive": {
+            "type": "button",
+            "body": {
+                "text": "Welcome to our small business! We offer handcrafted goods made with love. How can we assist you?"
+            },
+            "action": {
+                "buttons": [
+                    {"type": "reply", "reply": {"id": "menu_button", "title": "📜 View items"}},
+                    {"type": "reply", "reply": {"id": "contact_button", "title": "📞 Contact Us"}}
+                ]
+            }
+        }
+    }
+
+def send_welcome_message(to):
+    # 1. Send image message first
+    post_message(templates.render("welcome_image", to), "welcome_image", "Image", to=to)
+
+    # 2. Then send interactive button message
+    post_message(templates.render("welcome_buttons", to), "welcome_buttons", "Welcome Message", to=to)
+
+# A list message holds at most 10 rows: bigger catalogs get 8 products plus prev/next rows per page
+MENU_MAX_ROWS = 10
+MENU_PAGE_SIZE = 8
+MENU_PAGE_PREFIX = "menu_page:"
+
+def menu_pages(current):
+    """(page size, page count): one page if everything fits in a list message, else paged with nav rows"""
+    if len(current) <= MENU_MAX_ROWS:
+        return MENU_MAX_ROWS, 1
+    return MENU_PAGE_SIZE, current.page_count(MENU_PAGE_SIZE)
+
+
+@templates.register("menu")
+def menu_body(page=0):
+    current = services.catalog.current
+    page_size, page_count = menu_pages(current)
+    page = min(max(page, 0), page_count - 1)
+    text = "*✨ Our Handmade Collection:*\nSelect items one by one."
+    sections = [
+        {
+            "title": title[:24],
+            "rows": [{"id": product.id, "title": product.title[:24]} for product in products]
+        }
+        for title, products in current.page(page, page_size)
+    ]
+    if page_count > 1:
+        text += f"\n\nPage {page + 1} of {page_count}"
+        nav_rows = []
+        if page > 0:
+            nav_rows.append({"id": f"{MENU_PAGE_PREFIX}{page - 1}", "title": "⬅️ Previous page"})
+        if page < page_count - 1:
+            nav_rows.append({"id": f"{MENU_PAGE_PREFIX}{page + 1}", "title": "➡️ Next page"})
+        sections.append({"title": "More items", "rows": nav_rows})
+    return {
+        "type": "interactive",
+        "interactive": {
+            "type": "list",
+            "body": {"text": text},
+            "action": {
+                "button": "Choose Items",
+                "sections": sections
+            }
+        }
+    }
+
+def send_menu(to, page=0):
+    # The page is part of the template cache key, so only pages that exist may reach it
+    page = min(max(page, 0), menu_pages(services.catalog.current)[1] - 1)
+    post_message(templates.render("menu", to, page), "menu", f"Menu page {page + 1}", to=to)
+
+def send_search_results(to, query, products):
+    """Ranked matches as a list message; picking a row adds it to the cart like the menu does"""
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "interactive",
+        "interactive": {
+            "type": "list",
+            "body": {"text": f"*🔍 Results for \"{query[:50]}\":*\nSelect an item to add it to your cart."},
+            "action": {
+                "button": "Choose Items",
+                "sections": [{
+                    "title": "Best matches",
+                    "rows": [{"id": product.id, "title": product.title[:24]} for product in products]
+                }]
+            }
+        }
+    }
+    post_message(payload, "search_results", "Search Results", to=to)
+
+def send_product_cards(to, items=None):
+    """
+    Sends product cards with image and 'Add to Cart' buttons on WhatsApp.
+    `items` are catalog products (default: the whole catalog).
+    """
+    for item in items if items is not None else services.catalog.current.products:
+        try:
+            # Step 1: Send Product Image
+            if item.image:
+                image_payload = {
+                    "messaging_product": "whatsapp",
+                    "to": to,
+                    "type": "image",
+                    "image": services.media_cache.image(item.image),
+                }
+
+                if post_message(image_payload, "product_image", f"Image for {item.title}"):
+                    print(f"🖼️ Image sent for {item.title}")
+                else:
+                    print(f"❌ Failed to send image for {item.title}")
+
+            # Step 2: Send Button
+            button_payload = {
+                "messaging_product": "whatsapp",
+                "to": to,
+                "type": "interactive",
+                "interactive": {
+                    "type": "button",
+                    "body": {
+                        "text": f"*{item.title}*\n{item.description}"
+                    },
+                    "action": {
+                        "buttons": [
+                            {
+                                "type": "reply",
+                                "reply": {
+                                    "id": item.id,
+                                    "title": "➕ Add to Cart"
+                                }
+                            }
+                        ]
+                    }
+                }
+            }
+
+            if post_message(button_payload, "product_button", f"Button for {item.title}"):
+                print(f"✅ Button sent for {item.title}")
+            else:
+                print(f"❌ Failed to send button for {item.title}")
+
+        except Exception as e:
+            print(f"⚠️ Error sending card for {item.title}: {str(e)}")
+
+
+@templates.register("add_more_or_confirm")
+def add_more_or_confirm_body():
+    return {
+        "type": "interactive",
+        "interactive": {
+            "type": "button",
+            "body": {"text": "Do you want to add more items or confirm your order?"},
+            "action": {
+                "buttons": [
+                    {"type": "reply", "reply": {"id": "add_more", "title": "➕ Add More"}},
+                    {"type": "reply", "reply": {"id": "confirm_order", "title": "✅ Confirm Order"}}
+                ]
+            }
+        }
+    }
+
+def send_add_more_or_confirm_buttons(to):
+    post_message(templates.render("add_more_or_confirm", to), "add_more_or_confirm", "Add More or Confirm Buttons", to=to)
+
+@templates.register("payment_confirmation")
+def payment_confirmation_body():
+    return {
+        "type": "interactive",
+        "interactive": {
+            "type": "button",
+            "body": {"text": "✅ Once paid, click below to confirm your payment."},
+            "action": {
+                "buttons": [
+                    {
+                        "type": "reply",
+                        "reply": {"id": "payment_done", "title": "✅ Payment Done"}
+                    }
+                ]
+            }
+        }
+    }
+
+def send_payment_confirmation(to):
+    post_message(templates.render("payment_confirmation", to), "payment_confirmation", "Payment Confirmation Button", to=to)
+
+
+def format_line(item):
+    quantity = item.get("quantity", 1)
+    price_paise = round(item["price"] * 100)  # line totals in paise: 19.9 x 3 is ₹59.70, not 59.699...
+    if quantity == 1:
+        return f"- {item['name']}: {format_rupees(price_paise)}"
+    return f"- {item['name']} x{quantity}: {format_rupees(price_paise * quantity)}"
+
+
+def send_bill_to_seller(bill_data):
+    message = f"🧾 *New Order Received!*\n"
+    message += f"👤 Customer: {bill_data['username']}\n"
+    message += f"🏠 Address: {bill_data['address']}\n"
+    message += f"🕒 Time: {bill_data['timestamp']}\n\n"
+    message += "*🛍️ Items:*\n"
+    message += f"🧾 UPI Payment ID: {bill_data.get('payment_id', 'N/A')}\n\n"
+    message +="Order to be prepared in 5 days"
+    for item in bill_data["items"]:
+        message += format_line(item) + "\n"
+    message += f"\n💰 *Total: {format_rupees(round(bill_data['total'] * 100))}*"
+
+    payload = {
+        'messaging_product': 'whatsapp',
+        'to': config.SELLER_NUMBER,
+        'text': {'body': message}
+    }
+
+    post_message(payload, "seller_bill", "Bill to Seller")
+
+
+def warm_templates(catalog):
+    """Serialize the static bodies once (every menu page of `catalog`); sends only splice in the recipient"""
+    templates.warm(menu=range(menu_pages(catalog)[1]))
@@ -0,0 +1,174 @@
+"""Clients, stores and caches shared by every app in the process, each built on first use"""
+import os
+import threading
+
+from payload_templates import TemplateCache
+from webhook_batch import BatchStats
+
+from . import config
+
+
+class lazy:
+    """Like functools.cached_property, but the value is built once even when threads race for it"""
+
+    def __init__(self, build):
+        self.build = build
+        self.name = build.__name__
+        self.__doc__ = build.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with instance._build_lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.build(instance)
+        return instance.__dict__[self.name]
+
+
+class Services:
+    """Every heavy dependency of the app, imported and constructed the first time it is used.
+
+    Importing the package or creating an app opens no connection, database or file, so a test
+    that never reaches the order store or Razorpay never pays for them. prepare() in app.py
+    builds them all up front for production.
+    """
+
+    def __init__(self):
+        self._build_lock = threading.RLock()  # builders use each other (the outbox needs the client)
+        self.batch_stats = BatchStats()
+        self.templates = TemplateCache()
+
+    @lazy
+    def rate_limiter(self):
+        from rate_limiter import RateLimiter
+        return RateLimiter(
+            phone_rate=config.WA_RATE_PER_SECOND, phone_burst=config.WA_RATE_PER_SECOND,
+            recipient_rate=config.WA_RECIPIENT_RATE, recipient_burst=config.WA_RECIPIENT_BURST
+        )
+
+    # Retries and the breaker belong to the phone number, so the sync client and asgi.py's
+    # async client share them (as they share the rate limiter)
+
+    @lazy
+    def retry_policy(self):
+        from resilience import RetryPolicy
+        return RetryPolicy(max_attempts=config.WA_MAX_ATTEMPTS)
+
+    @lazy
+    def circuit_breaker(self):
+        from resilience import CircuitBreaker
+        return CircuitBreaker(failure_threshold=config.WA_BREAKER_THRESHOLD, reset_timeout=config.WA_BREAKER_RESET)
+
+    @lazy
+    def whatsapp(self):
+        from whatsapp_client import WhatsAppClient
+        return WhatsAppClient(
+            config.WHATSAPP_ACCESS_TOKEN, config.PHONE_NUMBER_ID,
+            base_url=config.GRAPH_API_BASE, pool_size=config.WA_POOL_SIZE, timeout=config.WA_TIMEOUT,
+            rate_limiter=self.rate_limiter, retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker
+        )
+
+    @lazy
+    def outbox(self):
+        from outbox import Outbox
+        return Outbox(config.OUTBOX_PATH, self.whatsapp, workers=config.OUTBOX_WORKERS,
+                      max_age=config.OUTBOX_MAX_AGE, lease=config.OUTBOX_LEASE)
+
+    @lazy
+    def media_cache(self):
+        from media_cache import MediaCache
+        # A new media id changes the pre-serialized image payloads, so drop them when one arrives
+        return MediaCache(
+            self.whatsapp, index_path=config.MEDIA_INDEX_PATH, enabled=config.MEDIA_CACHE,
+            on_change=lambda url: self.templates.invalidate()
+        )
+
+    @lazy
+    def order_log(self):
+        from order_log import OrderLog
+        order_log = OrderLog(config.ORDER_LOG_PATH, fsync=config.ORDER_LOG_FSYNC)
+        if not len(order_log) and os.path.exists(config.BILLS_EXPORT_PATH):
+            seeded = order_log.import_json(config.BILLS_EXPORT_PATH)
+            print(f"📥 Seeded order log with {seeded} order(s) from {config.BILLS_EXPORT_PATH}")
+        return order_log
+
+    @lazy
+    def sales_rollups(self):
+        from sales_rollups import SalesRollups
+        sales_rollups = SalesRollups(config.ORDER_STORE_PATH)
+        sales_rollups.ensure_built()
+        return sales_rollups
+
+    @lazy
+    def order_store(self):
+        from order_store import OrderStore
+        order_store = OrderStore(config.ORDER_STORE_PATH)
+        # Rollup triggers go in before any import so imported orders are counted as they land
+        self.sales_rollups
+        if not order_store.count():
+            for legacy_path, source in (("bills.json", "bill"), ("orders.json", "payment")):
+                if os.path.exists(legacy_path):
+                    print(f"📥 Imported {order_store.import_file(legacy_path, source)} order(s) from {legacy_path}")
+        return order_store
+
+    @lazy
+    def catalog(self):
+        from catalog import CatalogSource
+        return CatalogSource(config.CATALOG_PATH, on_change=self._catalog_changed)
+
+    @lazy
+    def search_index(self):
+        from search import SearchIndex
+        return SearchIndex(self.catalog.current.products)
+
+    def _catalog_changed(self, new_catalog):
+        # The menu pages and the search index are built from the catalog, so rebuild them on a swap
+        from search import SearchIndex
+        from .messages import warm_templates
+        self.search_index = SearchIndex(new_catalog.products)
+        self.templates.invalidate()
+        warm_templates(new_catalog)
+
+    # Cart per customer, and payment link reference -> customer
+
+    @lazy
+    def user_selections(self):
+        from cart import Cart
+        from session_store import create_session_store
+        return create_session_store(
+            config.SESSION_BACKEND, "carts", ttl=config.CART_TTL, max_entries=config.SESSION_MAX_ENTRIES,
+            path=config.SESSION_PATH, max_bytes=config.SESSION_MAX_BYTES, value_type=Cart
+        )
+
+    @lazy
+    def reference_map(self):
+        from session_store import create_session_store
+        return create_session_store(
+            config.SESSION_BACKEND, "payment_refs", ttl=config.PAYMENT_REF_TTL, max_entries=config.SESSION_MAX_ENTRIES,
+            path=config.SESSION_PATH, max_bytes=config.SESSION_MAX_BYTES
+        )
+
+    @lazy
+    def user_locks(self):
+        from user_locks import UserLocks
+        return UserLocks(config.USER_LOCK_DIR, stripes=config.USER_LOCK_STRIPES)
+
+    @lazy
+    def razorpay(self):
+        """Payment links client; the SDK is only imported once the first bill is generated"""
+        import razorpay
+        options = {"base_url": config.RAZORPAY_BASE_URL} if config.RAZORPAY_BASE_URL else {}
+        return razorpay.Client(auth=(config.RAZORPAY_KEY_ID, config.RAZORPAY_SECRET), **options)
+
+    def after_fork(self):
+        """Drop pooled connections inherited from the parent; the socket must not be shared with siblings"""
+        if "whatsapp" in self.__dict__:
+            self.whatsapp.session.close()  # the session opens fresh connections on the next send
+
+    def built(self):
+        """Names of the services constructed so far"""
+        return sorted(name for name, value in vars(type(self)).items()
+                      if isinstance(value, lazy) and name in self.__dict__)
+
+
+services = Services()
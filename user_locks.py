@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only cover threads of this process
+    fcntl = None
+
+
+class UserLocks:
+    """Per-customer mutual exclusion across threads and worker processes on one host.
+
+    Customers hash onto a fixed set of lock files (striping), so the number of open files
+    stays constant however many customers there are. flock() excludes other processes;
+    a thread lock per stripe excludes other threads here, since flock is per open file.
+    """
+
+    def __init__(self, directory="locks", stripes=64):
+        self.directory = directory
+        self.stripes = stripes
+        os.makedirs(directory, exist_ok=True)
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+        self._fds = [None] * stripes
+        self._fd_lock = threading.Lock()
+        self._pid = os.getpid()
+        self.acquired = 0
+        self.wait_total = 0.0
+
+    def stripe_for(self, key):
+        return zlib.crc32(str(key).encode("utf-8")) % self.stripes
+
+    def _fd(self, stripe):
+        with self._fd_lock:
+            if self._pid != os.getpid():  # forked: file locks are not shared with the parent
+                self._fds = [None] * self.stripes
+                self._pid = os.getpid()
+            fd = self._fds[stripe]
+            if fd is None:
+                fd = os.open(os.path.join(self.directory, f"stripe-{stripe}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+                self._fds[stripe] = fd
+            return fd
+
+    @contextmanager
+    def lock(self, key):
+        stripe = self.stripe_for(key)
+        started = time.perf_counter()
+        with self._thread_locks[stripe]:
+            fd = self._fd(stripe) if fcntl is not None else None
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self.acquired += 1
+            self.wait_total += time.perf_counter() - started
+            try:
+                yield
+            finally:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def stats(self):
+        return {
+            "stripes": self.stripes,
+            "acquired": self.acquired,
+            "wait_avg_ms": round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+        }
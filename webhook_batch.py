@@ -0,0 +1,73 @@
+import threading
+
+
+def iter_messages(data):
+    """Yield (value, message) for every message of every change of every entry in a delivery"""
+    for entry in data.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            for message in value.get("messages") or []:
+                yield value, message
+
+
+def process_batch(data, handle_message):
+    """Call handle_message(sender, message) for each message in the delivery.
+
+    Returns (processed, failed): how many calls returned and how many raised. When
+    handle_message only queues the message, that is the queueing, not the handling.
+    """
+    processed = failed = 0
+    for _, message in iter_messages(data):
+        sender = message.get("from")
+        if not sender:
+            continue
+        try:
+            handle_message(sender, message)
+        except Exception as e:
+            print(f"❌ Failed to handle message {message.get('id')} from {sender}: {e}")
+            failed += 1
+        else:
+            processed += 1
+    return processed, failed
+
+
+class BatchStats:
+    """Running totals of messages per webhook delivery, and of how handling them turned out.
+
+    A delivery is recorded when it arrives; each message's outcome when its handler finishes,
+    which with a queue in between (WEBHOOK_ASYNC, asgi.py) is after the delivery was answered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.deliveries = 0
+        self.messages = 0
+        self.handled = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def record(self, count):
+        """A delivery of `count` messages arrived"""
+        with self._lock:
+            self.deliveries += 1
+            self.messages += count
+            self.largest_batch = max(self.largest_batch, count)
+
+    def record_outcome(self, ok):
+        """One message's handler returned (ok) or raised"""
+        with self._lock:
+            if ok:
+                self.handled += 1
+            else:
+                self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "deliveries": self.deliveries,
+                "messages": self.messages,
+                "handled": self.handled,
+                "failed": self.failed,
+                "largest_batch": self.largest_batch,
+                "avg_batch": round(self.messages / self.deliveries, 2) if self.deliveries else 0.0,
+            }
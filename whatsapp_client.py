@@ -0,0 +1,242 @@
+import asyncio
+import contextvars
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from resilience import CircuitBreaker, RetryPolicy
+
+
+# Set (to a list) while a handler runs under the ASGI server: sends are appended as
+# (payload, label, description, to) and delivered afterwards by the async client, in order
+deferred_sends = contextvars.ContextVar("deferred_sends", default=None)
+
+
+def response_json(response):
+    """Response body as a dict; never raises on a missing response or a non-JSON body"""
+    if response is None:
+        return {"error": "not sent"}
+    try:
+        return response.json()
+    except ValueError:
+        return {"status": response.status_code, "body": response.text[:200]}
+
+
+class WhatsAppClient:
+    """Shared keep-alive client for the WhatsApp Cloud (Graph) API"""
+
+    def __init__(self, access_token, phone_number_id, base_url="https://graph.facebook.com",
+                 api_version="v16.0", pool_size=10, timeout=10, rate_limiter=None,
+                 retry_policy=None, circuit_breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.messages_url = f"{self.base_url}/{api_version}/{phone_number_id}/messages"
+        self.media_url = f"{self.base_url}/{api_version}/{phone_number_id}/media"
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        self.session = self._open_session(access_token, pool_size)
+
+        self._timings_lock = threading.Lock()
+        self._timings = {}
+        self.retries = 0
+        self.gave_up = 0
+
+    def _open_session(self, access_token, pool_size):
+        session = requests.Session()
+        session.headers.update({
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def warm_up(self):
+        """Open a pooled connection (TCP + TLS) before the first real send"""
+        started = time.monotonic()
+        try:
+            self.session.head(self.base_url, timeout=self.timeout)
+            print(f"🔥 Graph API connection warmed in {(time.monotonic() - started) * 1000:.0f} ms")
+        except requests.RequestException as e:
+            print(f"⚠️ Graph API warm-up failed: {e}")
+
+    def send(self, payload, label="message", to=None):
+        """POST a message payload, retrying throttled and transient failures.
+
+        `payload` is a dict or an already-encoded JSON body (bytes, with `to` given).
+        Returns the last response, or None if the breaker is open or the API was unreachable.
+        """
+        if isinstance(payload, dict):
+            to = payload.get("to")
+            payload = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        policy = self.retry_policy
+        response = None
+        for attempt in range(1, policy.max_attempts + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(to)
+
+            if not self.circuit_breaker.allow():
+                print(f"⛔ Circuit open, not sending {label}")
+                break
+
+            started = time.monotonic()
+            response, outcome = None, "transient"  # also what an uncaught error counts as
+            try:
+                response = self.session.post(self.messages_url, data=payload, timeout=self.timeout)
+                outcome = policy.classify(response)
+            except requests.RequestException as e:
+                print(f"⚠️ {label} attempt {attempt} failed: {e}")
+            finally:
+                self._record(label, time.monotonic() - started)
+                # Every call allow() let through must report back, or a half-open breaker waits on it
+                self.circuit_breaker.record(outcome)
+
+            if outcome in ("ok", "fatal"):
+                return response
+
+            if attempt < policy.max_attempts:
+                retry_after = response.headers.get("Retry-After") if response is not None else None
+                with self._timings_lock:
+                    self.retries += 1
+                time.sleep(policy.delay(attempt, throttled=outcome == "throttled", retry_after=retry_after))
+
+        with self._timings_lock:
+            self.gave_up += 1
+        print(f"❌ Giving up on {label} to {to}")
+        return response
+
+    def upload_media(self, content, mime_type, filename="upload"):
+        """Upload a file to the /media endpoint and return its media id"""
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                self.media_url,
+                data={"messaging_product": "whatsapp", "type": mime_type},
+                files={"file": (filename, content, mime_type)},
+                # Drop the session's JSON content type so requests sets the multipart boundary
+                headers={"Content-Type": None},
+                timeout=self.timeout,
+            )
+        finally:
+            self._record("media_upload", time.monotonic() - started)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def _record(self, label, elapsed):
+        with self._timings_lock:
+            timing = self._timings.setdefault(label, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            timing["calls"] += 1
+            timing["total_ms"] += elapsed * 1000
+            timing["max_ms"] = max(timing["max_ms"], elapsed * 1000)
+
+    def stats(self):
+        """Per-label call count and latency, plus retry and breaker counters"""
+        with self._timings_lock:
+            calls = {
+                label: {
+                    "calls": t["calls"],
+                    "avg_ms": round(t["total_ms"] / t["calls"], 2),
+                    "max_ms": round(t["max_ms"], 2),
+                }
+                for label, t in self._timings.items()
+            }
+            retries, gave_up = self.retries, self.gave_up
+        return {
+            "calls": calls,
+            "retries": retries,
+            "gave_up": gave_up,
+            "circuit_breaker": self.circuit_breaker.stats(),
+        }
+
+
+class AsyncWhatsAppClient(WhatsAppClient):
+    """WhatsAppClient on httpx.AsyncClient for the ASGI server: waiting on the API holds no thread.
+
+    Retries, backoff, rate limits and the circuit breaker behave exactly as in the sync client
+    (pass the same RateLimiter and CircuitBreaker to share them); waits are asyncio sleeps.
+    """
+
+    def _open_session(self, access_token, pool_size):
+        import httpx  # only the ASGI server needs httpx
+
+        # Not just TransportError: DecodingError and TooManyRedirects are request failures too
+        self._request_errors = (httpx.RequestError,)
+        return httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def warm_up(self):
+        started = time.monotonic()
+        try:
+            await self.session.head(self.base_url)
+            print(f"🔥 Graph API connection warmed in {(time.monotonic() - started) * 1000:.0f} ms (async)")
+        except self._request_errors as e:
+            print(f"⚠️ Graph API warm-up failed: {type(e).__name__} {e}")
+
+    async def send(self, payload, label="message", to=None):
+        if isinstance(payload, dict):
+            to = payload.get("to")
+            payload = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        policy = self.retry_policy
+        response = None
+        for attempt in range(1, policy.max_attempts + 1):
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve(to)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            if not self.circuit_breaker.allow():
+                print(f"⛔ Circuit open, not sending {label}")
+                break
+
+            started = time.monotonic()
+            response, outcome = None, "transient"  # also what an uncaught error or a cancellation counts as
+            try:
+                response = await self.session.post(
+                    self.messages_url, content=payload, headers={"Content-Type": "application/json"}
+                )
+                outcome = policy.classify(response)
+            except self._request_errors as e:
+                print(f"⚠️ {label} attempt {attempt} failed: {type(e).__name__} {e}")
+            finally:
+                self._record(label, time.monotonic() - started)
+                # Every call allow() let through must report back, or a half-open breaker waits on it
+                self.circuit_breaker.record(outcome)
+
+            if outcome in ("ok", "fatal"):
+                return response
+
+            if attempt < policy.max_attempts:
+                retry_after = response.headers.get("Retry-After") if response is not None else None
+                with self._timings_lock:
+                    self.retries += 1
+                await asyncio.sleep(policy.delay(attempt, throttled=outcome == "throttled", retry_after=retry_after))
+
+        with self._timings_lock:
+            self.gave_up += 1
+        print(f"❌ Giving up on {label} to {to}")
+        return response
+
+    async def upload_media(self, content, mime_type, filename="upload"):
+        started = time.monotonic()
+        try:
+            response = await self.session.post(
+                self.media_url,
+                data={"messaging_product": "whatsapp", "type": mime_type},
+                files={"file": (filename, content, mime_type)},
+            )
+        finally:
+            self._record("media_upload", time.monotonic() - started)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def aclose(self):
+        await self.session.aclose()
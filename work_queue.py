@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+
+
+class WorkQueue:
+    """In-process job queue drained by a small pool of worker threads"""
+
+    def __init__(self, workers=4, name="webhook"):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.done = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self):
+        """Start the worker threads (safe to call more than once)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"{self.name}-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, func, *args):
+        """Queue func(*args) and return immediately"""
+        if not self._threads:
+            self.start()
+        with self._stats_lock:
+            self.enqueued += 1
+        self._queue.put((time.monotonic(), func, args))
+
+    def join(self):
+        """Block until every queued job has been processed"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            enqueued_at, func, args = self._queue.get()
+            ok = True
+            try:
+                func(*args)
+            except Exception as e:
+                ok = False
+                print(f"❌ {self.name} job {getattr(func, '__name__', func)} failed: {e}")
+            finally:
+                latency = time.monotonic() - enqueued_at
+                with self._stats_lock:
+                    if ok:
+                        self.done += 1
+                    else:
+                        self.failed += 1
+                    self.latency_total += latency
+                    self.latency_max = max(self.latency_max, latency)
+                self._queue.task_done()
+
+    def stats(self):
+        """Queue depth and enqueue-to-done latency counters"""
+        with self._stats_lock:
+            finished = self.done + self.failed
+            return {
+                "workers": self.workers,
+                "depth": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "done": self.done,
+                "failed": self.failed,
+                "latency_avg_ms": round(self.latency_total / finished * 1000, 2) if finished else 0.0,
+                "latency_max_ms": round(self.latency_max * 1000, 2),
+            }